@@ -0,0 +1,227 @@
+import _thread
+import multiprocessing as mp
+import sys
+import threading
+import time
+from Cancellation import CancelToken
+from WorkerProcess import spawn_worker
+
+
+STATS_INTERVAL = 2.0  # Seconds between stats events from the assistant
+CANCEL_GRACE = 3.0    # Seconds the pipeline gets to unwind from a cancel before main is interrupted
+
+
+class EventSender:
+    """Child side of the pipe; Connection.send is not thread-safe, so sends are serialized"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def send(self, type, **fields):
+        fields.update(type=type, time=time.time())
+        with self.lock:
+            try:
+                self.conn.send(fields)
+            except (OSError, EOFError):
+                pass  # The server went away; nothing left to report to
+
+
+class TranscriptStream:
+    """Replaces sys.stdout in the assistant process: each printed line becomes a transcript event"""
+
+    def __init__(self, events, original):
+        self.events = events
+        self.original = original
+
+    def write(self, message):
+        message = message.strip()
+        if message:
+            self.events.send('transcript', text=message)
+            # Also write to the original stdout for debugging
+            self.original.write(message + '\n')
+            self.original.flush()
+
+    def flush(self):
+        self.original.flush()
+
+
+def _send_stats(events, assistant, tracking, stop):
+    while not stop.wait(STATS_INTERVAL):
+        try:
+            # Multi-stream tracking is only reported if something in this process started it
+            multistream = sys.modules.get('MultiStreamTracking')
+            streams = multistream.GetStreamStats().get('streams', {}) if multistream else {}
+            events.send('stats', tracker=tracking.GetTrackerStats(), response_cache=assistant.response_cache.stats(),
+                        vision_cache=assistant.vision_cache.stats(), streams=streams)
+        except Exception as e:
+            print(f"Error collecting assistant stats: {e}")
+
+
+def _receive_commands(conn, stop, finished, token):
+    """On a stop command cancel the pipeline's token; interrupt the main thread if it does not unwind"""
+    while not stop.is_set():
+        try:
+            if not conn.poll(0.5):
+                continue
+            command = conn.recv()
+        except (OSError, EOFError):
+            command = {'type': 'stop'}  # The server is gone
+        if command.get('type') == 'stop':
+            stop.set()
+            token.cancel("stop requested")
+            if not finished.wait(CANCEL_GRACE):
+                _thread.interrupt_main()
+
+
+def assistant_main(conn):
+    """Entry point of the assistant process: run main.main() and stream what happens as events"""
+    events = EventSender(conn)
+    sys.stdout = TranscriptStream(events, sys.__stdout__)
+    events.send('status', state='starting')
+    stop = threading.Event()
+    finished = threading.Event()
+    # Created before the heavy imports, so a stop that arrives while they load still cancels the run
+    token = CancelToken()
+    threading.Thread(target=_receive_commands, args=(conn, stop, finished, token), daemon=True).start()
+    try:
+        # The heavy imports (Manim, MoviePy, OpenCV, TTS) happen here, not in the server
+        import main as assistant
+        import YOLOTracking
+
+        # Report what the user said, so the server can react (e.g. open the whiteboard)
+        get_voice_input = assistant.get_voice_input
+
+        def reporting_get_voice_input():
+            user_input = get_voice_input()
+            if user_input:
+                events.send('user_input', text=user_input)
+            return user_input
+
+        assistant.get_voice_input = reporting_get_voice_input
+
+        # Tell the server about every finished artifact as soon as it is stored
+        add_media = assistant.media_store.add
+
+        def reporting_add(*args, **kwargs):
+            entry = add_media(*args, **kwargs)
+            events.send('media_ready', entry=entry)
+            return entry
+
+        assistant.media_store.add = reporting_add
+        assistant.cancel_token = token
+        if token.cancelled:
+            events.send('cancelled', report=token.report())
+            events.send('status', state='stopped')
+            return
+
+        threading.Thread(target=_send_stats, args=(events, assistant, YOLOTracking, stop), daemon=True).start()
+        events.send('status', state='running')
+        assistant.main()
+        if token.cancelled:
+            events.send('cancelled', report=token.report())
+        events.send('status', state='stopped')
+    except (KeyboardInterrupt, SystemExit):
+        # interrupt_main() after the cancel grace period, or terminate() from the supervisor
+        events.send('status', state='stopped')
+    except Exception as e:
+        events.send('status', state='error', error=str(e))
+    finally:
+        stop.set()
+        finished.set()
+        try:
+            YOLOTracking.StopYOLOTracking()
+        except Exception:
+            pass
+        sys.stdout = sys.__stdout__
+        conn.close()
+
+
+class AssistantSupervisor:
+    """Hosts the assistant in a spawned child process and hands its events to the server.
+
+    CPU-heavy work (rendering, encoding, TTS) then runs outside the server's interpreter, so
+    it no longer competes with request handling for the GIL. on_event is called from the
+    supervisor thread with each event dict; it always has 'type' and 'time'.
+    """
+
+    def __init__(self, on_event):
+        self.on_event = on_event
+        self.process = None
+        self.conn = None
+        self.thread = None
+        self.state = 'idle'
+        self.stats = {}
+        self.stopping = False
+        self.cancel_report = None
+
+    def is_running(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return False
+        ctx = mp.get_context('spawn')
+        self.conn, child_conn = ctx.Pipe()
+        # Only AssistantProcess and what it imports load in the child, not the Flask app
+        self.process = spawn_worker(ctx, assistant_main, (child_conn,))
+        child_conn.close()  # Only the child holds its end, so EOF arrives when it exits
+        self.state = 'starting'
+        self.stopping = False
+        self.cancel_report = None
+        self.thread = threading.Thread(target=self._supervise, args=(self.process, self.conn), daemon=True)
+        self.thread.start()
+        return True
+
+    def _supervise(self, process, conn):
+        """Forward events until the child exits, then report how it ended"""
+        while True:
+            try:
+                if not conn.poll(0.5):
+                    if not process.is_alive():
+                        break
+                    continue
+                event = conn.recv()
+            except (OSError, EOFError):
+                break
+            if event['type'] == 'status':
+                self.state = event['state']
+            elif event['type'] == 'stats':
+                self.stats = event
+            elif event['type'] == 'cancelled':
+                self.cancel_report = event['report']
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Error handling assistant event: {e}")
+        process.join(timeout=1.0)
+        if self.state not in ('stopped', 'error'):
+            # Killed before it could report; only an error if nobody asked it to stop
+            event = {'type': 'status', 'state': 'stopped', 'time': time.time()}
+            if not self.stopping:
+                event.update(state='error', error=f"Assistant process exited with code {process.exitcode}")
+            self.state = event['state']
+            self.on_event(event)
+
+    def stop(self, timeout=5.0):
+        """Ask the assistant to stop, terminating it if it does not exit within timeout.
+
+        Returns the cancellation report (stages aborted, partial files removed, seconds taken),
+        or None if it was not running or had to be terminated before reporting.
+        """
+        if not self.is_running():
+            return None
+        self.stopping = True
+        try:
+            self.conn.send({'type': 'stop'})
+        except (OSError, EOFError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.kill()
+        if self.thread:
+            self.thread.join(1.0)  # Let the last events, including the report, be handled
+        return self.cancel_report
@@ -0,0 +1,227 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import time
+import cv2
+import numpy as np
+from WorkerProcess import spawn_worker
+
+try:
+    from multiprocessing import resource_tracker
+except ImportError:
+    resource_tracker = None
+
+
+BROKER_NAME = "learnitlive_camera"
+RING_SLOTS = 4
+
+# Header layout (int64): magic, latest sequence number, width, height, channels, slots, running
+MAGIC = 0x4C494C43414D  # "LILCAM"
+HEADER_FIELDS = 8
+H_MAGIC, H_LATEST, H_WIDTH, H_HEIGHT, H_CHANNELS, H_SLOTS, H_RUNNING = range(7)
+
+
+def _ring_size(width, height, channels, slots):
+    return HEADER_FIELDS * 8 + slots * 16 + slots * width * height * channels
+
+
+class FrameRing:
+    """Numpy views over the shared-memory block: header, per-slot sequence numbers and timestamps, frames"""
+
+    def __init__(self, shm, width=None, height=None, channels=None, slots=None):
+        self.shm = shm
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        if width is None:
+            width, height, channels, slots = (int(v) for v in self.header[H_WIDTH:H_SLOTS + 1])
+        offset = HEADER_FIELDS * 8
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += slots * 8
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset += slots * 8
+        self.frames = np.ndarray((slots, height, width, channels), dtype=np.uint8, buffer=shm.buf, offset=offset)
+        self.slots = slots
+
+    def release(self):
+        # Views must go before the mapping can be closed
+        self.header = self.seqs = self.timestamps = self.frames = None
+        self.shm.close()
+
+
+def _broker_main(device, width, height, slots, name, ready, stop):
+    """Broker process: own the camera and write every frame into the next ring slot"""
+    cap = cv2.VideoCapture(device)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    ret, frame = cap.read()
+    if not ret:
+        print("Camera broker could not read from the camera")
+        cap.release()
+        return
+
+    height, width, channels = frame.shape
+    shm = shared_memory.SharedMemory(name=name, create=True, size=_ring_size(width, height, channels, slots))
+    ring = FrameRing(shm, width, height, channels, slots)
+    ring.header[:] = 0
+    ring.header[H_WIDTH:H_SLOTS + 1] = (width, height, channels, slots)
+    ring.header[H_RUNNING] = 1
+    ring.header[H_MAGIC] = MAGIC
+    ready.set()
+
+    seq = 0
+    try:
+        while not stop.is_set():
+            slot = (seq + 1) % slots
+            # A negative sequence number marks the slot as being written
+            ring.seqs[slot] = -(seq + 1)
+            target = ring.frames[slot]
+            ret, frame = cap.read(target)
+            if not ret:
+                print("Camera broker failed to capture frame")
+                time.sleep(0.1)
+                continue
+            if frame is not target:
+                np.copyto(target, frame)
+            seq += 1
+            ring.timestamps[slot] = time.time()
+            ring.seqs[slot] = seq
+            ring.header[H_LATEST] = seq
+    finally:
+        ring.header[H_RUNNING] = 0
+        cap.release()
+        ring.release()
+        shm.unlink()
+        print("Camera broker stopped")
+
+
+class CameraBroker:
+    """Owns the camera in a child process and publishes frames into a shared-memory ring"""
+
+    def __init__(self, device=0, width=1280, height=720, slots=RING_SLOTS, name=BROKER_NAME):
+        self.device = device
+        self.width = width
+        self.height = height
+        self.slots = slots
+        self.name = name
+        self.process = None
+        self.stop_event = None
+
+    def start(self, timeout=10.0):
+        """Start the broker process and wait until the ring is ready"""
+        if self.process and self.process.is_alive():
+            return False
+        ctx = mp.get_context('spawn')
+        ready = ctx.Event()
+        self.stop_event = ctx.Event()
+        self.process = spawn_worker(ctx, _broker_main, (self.device, self.width, self.height, self.slots,
+                                                         self.name, ready, self.stop_event))
+        deadline = time.time() + timeout
+        while not ready.wait(0.1):
+            if not self.process.is_alive() or time.time() > deadline:
+                return False
+        return True
+
+    def stop(self):
+        """Stop the broker process; attached clients see the stream end"""
+        if self.process and self.process.is_alive():
+            self.stop_event.set()
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()  # Raises SystemExit in the broker, so the ring is still unlinked
+                self.process.join(timeout=2.0)
+        self.process = None
+
+
+class CameraClient:
+    """Attach to a running broker. Mirrors the parts of cv2.VideoCapture the app uses."""
+
+    def __init__(self, name=BROKER_NAME):
+        shm = shared_memory.SharedMemory(name=name)
+        # Attaching registers the block with this process's resource tracker, which would
+        # unlink it when this process exits; only the broker owns it.
+        if resource_tracker is not None:
+            try:
+                resource_tracker.unregister(shm._name, 'shared_memory')
+            except Exception:
+                pass
+        self.ring = FrameRing(shm)
+        if self.ring.header[H_MAGIC] != MAGIC:
+            self.ring.release()
+            raise RuntimeError(f"Shared memory block {name} is not a camera ring")
+        self.last_seq = 0
+
+    def isOpened(self):
+        return self.ring is not None and bool(self.ring.header[H_RUNNING])
+
+    def set(self, prop, value):
+        # The broker owns capture settings
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.ring.header[H_WIDTH])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.ring.header[H_HEIGHT])
+        return 0.0
+
+    def read_latest(self, copy=False, timeout=1.0):
+        """Wait for a frame newer than the last one read; returns (seq, frame, timestamp) or None.
+
+        Without copy the frame is a read-only view into the ring. It stays valid until the
+        broker wraps around to its slot, RING_SLOTS - 1 frames later; use is_current(seq) or
+        copy=True when holding on to it.
+        """
+        deadline = time.time() + timeout
+        while self.isOpened():
+            seq = int(self.ring.header[H_LATEST])
+            if seq > self.last_seq:
+                slot = seq % self.ring.slots
+                frame = self.ring.frames[slot]
+                timestamp = float(self.ring.timestamps[slot])
+                frame = frame.copy() if copy else frame.view()
+                if self.ring.seqs[slot] == seq:
+                    self.last_seq = seq
+                    if not copy:
+                        frame.flags.writeable = False
+                    return seq, frame, timestamp
+                continue  # The broker overwrote the slot while we looked at it
+            if time.time() > deadline:
+                return None
+            time.sleep(0.002)
+        return None
+
+    def is_current(self, seq):
+        """Check that the slot holding frame seq has not been overwritten yet"""
+        return self.ring is not None and self.ring.seqs[seq % self.ring.slots] == seq
+
+    def read(self, copy=False):
+        """cv2.VideoCapture-style read returning (ret, frame)"""
+        item = self.read_latest(copy=copy)
+        if item is None:
+            return False, None
+        return True, item[1]
+
+    def release(self):
+        if self.ring is not None:
+            self.ring.release()
+            self.ring = None
+
+
+def open_camera(device=0, name=BROKER_NAME):
+    """Attach to the camera broker if one is running, otherwise open the device directly"""
+    try:
+        return CameraClient(name)
+    except (FileNotFoundError, RuntimeError):
+        return cv2.VideoCapture(device)
+
+
+if __name__ == "__main__":
+    broker = CameraBroker()
+    if not broker.start():
+        print("Camera broker failed to start")
+    else:
+        print(f"Camera broker running as '{broker.name}', press Ctrl+C to stop")
+        try:
+            while broker.process.is_alive():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        broker.stop()
@@ -0,0 +1,174 @@
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+
+
+class Cancelled(BaseException):
+    """Raised inside a pipeline stage once its CancelToken has been cancelled.
+
+    A BaseException, like KeyboardInterrupt, so the pipeline's broad 'except Exception'
+    handlers do not swallow it.
+    """
+
+
+class CancelToken:
+    """Cooperative cancellation shared by every stage of the assistant pipeline.
+
+    Stages call check() between steps. Blocking work registers an on_cancel callback that
+    aborts it (kill a process group, close an HTTP session, stop TTS); cancel() runs those
+    callbacks at once. Partial files are tracked and removed by cleanup(). report() summarizes
+    what was cancelled and how long stopping took.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.callbacks = {}
+        self.next_handle = 0
+        self.artifacts = []
+        self.reason = None
+        self.cancelled_at = None
+        self.stages = []    # Stages that were interrupted, in order
+        self.removed = []   # Partial artifacts deleted by cleanup()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def cancel(self, reason="stop requested"):
+        """Cancel and run every registered abort callback; returns False if already cancelled"""
+        with self.lock:
+            if self.event.is_set():
+                return False
+            self.reason = reason
+            self.cancelled_at = time.time()
+            self.event.set()
+            callbacks = list(self.callbacks.values())
+            self.callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error while cancelling: {e}")
+        return True
+
+    def check(self, stage=None):
+        """Raise Cancelled if the token was cancelled, noting which stage noticed"""
+        if self.event.is_set():
+            self._note(stage)
+            raise Cancelled(stage or self.reason)
+
+    def _note(self, stage):
+        if stage and stage not in self.stages:
+            self.stages.append(stage)
+
+    def on_cancel(self, callback):
+        """Register an abort callback; runs immediately if already cancelled. Returns a handle."""
+        with self.lock:
+            if not self.event.is_set():
+                handle = self.next_handle
+                self.next_handle += 1
+                self.callbacks[handle] = callback
+                return handle
+        callback()
+        return None
+
+    def remove(self, handle):
+        """Unregister a callback once the work it aborts has finished"""
+        with self.lock:
+            self.callbacks.pop(handle, None)
+
+    def track(self, path):
+        """Remember a file or directory to delete if the pipeline is cancelled"""
+        self.artifacts.append(path)
+        return path
+
+    def keep_artifacts(self):
+        """The job finished: its tracked files are results now, not partial artifacts"""
+        self.artifacts = []
+
+    def cleanup(self):
+        """Delete tracked partial artifacts that still exist"""
+        for path in self.artifacts:
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                elif os.path.exists(path):
+                    os.remove(path)
+                else:
+                    continue
+                self.removed.append(path)
+            except OSError as e:
+                print(f"Could not remove {path}: {e}")
+        self.artifacts = []
+
+    def report(self):
+        return {'reason': self.reason, 'stages': list(self.stages), 'removed': list(self.removed),
+                'seconds_to_stop': time.time() - self.cancelled_at if self.cancelled_at else None}
+
+
+def run_process(cmd, token, stage, grace=2.0, env=None):
+    """Run a command in its own process group; cancelling kills the whole group.
+
+    Returns the exit code. SIGTERM goes to the group first, SIGKILL after grace seconds,
+    so renderers and their ffmpeg children all stop. env, if given, replaces the environment.
+    A command that cannot be started (e.g. not installed) returns 127, as it did under a shell.
+    """
+    token.check(stage)
+    try:
+        process = subprocess.Popen(cmd, start_new_session=True, env=env)
+    except OSError as e:
+        print(f"Could not run {cmd[0]}: {e}")
+        return 127
+
+    def kill_group():
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                process.wait(grace)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    handle = token.on_cancel(kill_group)
+    try:
+        returncode = process.wait()
+    finally:
+        token.remove(handle)
+    token.check(stage)
+    return returncode
+
+
+def call_cancellable(token, stage, fn, *args, abort=None, **kwargs):
+    """Run a blocking call (HTTP, TTS) in a helper thread and stop waiting as soon as the token is cancelled.
+
+    abort, if given, is called on cancel to make the call itself return early, e.g. closing
+    the requests.Session it uses. Exceptions from fn are re-raised in the caller.
+    """
+    token.check(stage)
+    outcome = {}
+
+    def target():
+        try:
+            outcome['value'] = fn(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    handle = token.on_cancel(abort) if abort else None
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(0.1)
+            token.check(stage)
+    finally:
+        if handle is not None:
+            token.remove(handle)
+    token.check(stage)  # An aborted call fails; report it as cancelled, not as its error
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('value')
@@ -0,0 +1,375 @@
+import abc
+import ast
+import json
+import math
+import operator
+import os
+import re
+from manim import *
+
+
+SPEC_ENV = "LEARNITLIVE_SCENE_SPEC"  # Path of the JSON spec the scene renders
+
+# Scene class rendering each template
+SCENES = {
+    'labelled_diagram': 'LabelledDiagram',
+    'step_list': 'StepList',
+    'equation_walkthrough': 'EquationWalkthrough',
+    'graph_plot': 'GraphPlot',
+}
+
+# What the LLM is asked to reply with; a filled spec is a few dozen tokens instead of a whole script
+TEMPLATE_GUIDE = """Reply with one JSON object and nothing else, using the template that fits the topic best:
+{"template": "labelled_diagram", "title": str, "shape": "rectangle" or "circle", "parts": [[label, x, y], ...]}  up to 8 parts of one object; x and y from -1 to 1 place each part on it
+{"template": "step_list", "title": str, "steps": [str, ...]}  up to 6 short steps of a process
+{"template": "equation_walkthrough", "title": str, "steps": [[latex, note], ...]}  up to 6 lines of a derivation in basic math LaTeX (\\frac, \\sqrt, Greek letters), each with a short note
+{"template": "graph_plot", "title": str, "functions": [[expr, label], ...], "x_range": [min, max]}  up to 3 functions of x in Python syntax (sin, cos, tan, exp, log, sqrt, abs, pi, e), continuous over x_range
+Titles up to 40 characters, labels 24, steps and notes 60."""
+
+TITLE_CHARS = 40
+LABEL_CHARS = 24
+STEP_CHARS = 60
+LATEX_CHARS = 80
+EXPRESSION_CHARS = 80
+MAX_PARTS = 8
+MAX_STEPS = 6
+MAX_FUNCTIONS = 3
+GRAPH_SAMPLES = 200
+MAX_JUMP = 0.25  # Largest step between neighbouring graph samples, as a fraction of the y span
+
+PALETTE = [BLUE, PURPLE, ORANGE, TEAL, YELLOW, RED, GREEN, GRAY]
+
+# The only LaTeX commands an equation may use. LLM output is untrusted TeX, and a blocklist can be
+# dodged (\csname input\endcsname, ^^ escapes), so everything else is rejected.
+LATEX_COMMANDS = set("""
+    alpha beta gamma delta epsilon varepsilon zeta eta theta vartheta iota kappa lambda mu nu xi pi varpi
+    rho sigma tau upsilon phi varphi chi psi omega Gamma Delta Theta Lambda Xi Pi Sigma Upsilon Phi Psi Omega
+    frac dfrac tfrac binom sqrt sum prod int iint oint lim limits infty partial nabla prime degree
+    cdot cdots ldots dots times div pm mp le leq ge geq neq ne approx equiv sim propto
+    to rightarrow leftarrow Rightarrow Leftarrow leftrightarrow iff implies mapsto
+    in notin subset subseteq cup cap forall exists circ mid vert Vert
+    left right big Big bigg Bigg langle rangle lfloor rfloor lceil rceil
+    sin cos tan sec csc cot arcsin arccos arctan sinh cosh tanh log ln exp max min det
+    text mathrm mathbf mathit mathbb mathcal operatorname vec hat bar dot ddot overline underline quad qquad
+""".split())
+LATEX_SYMBOLS = set(",;!{}|% \\")  # Single-character commands such as \, (thin space) and \{
+LATEX_COMMAND = re.compile(r"\\([A-Za-z]+|.)")
+
+FUNCTIONS = {'sin': math.sin, 'cos': math.cos, 'tan': math.tan, 'exp': math.exp, 'log': math.log,
+             'sqrt': math.sqrt, 'abs': abs}
+CONSTANTS = {'pi': math.pi, 'e': math.e}
+OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+             ast.Pow: operator.pow, ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+# Shown when a scene is rendered by hand, e.g. manim -pql ManimTemplates.py LabelledDiagram
+EXAMPLES = {
+    'labelled_diagram': {'template': 'labelled_diagram', 'title': "Raspberry Pi 4B - PCB Overview", 'shape': 'rectangle',
+                         'parts': [["CPU (BCM2711)", -0.7, 0.5], ["RAM", -0.35, 0.5], ["GPIO Header", 0.9, 0.5],
+                                   ["USB Ports", 0.45, -0.8], ["Gigabit Ethernet", 0.8, -0.8],
+                                   ["2x Micro HDMI", -0.3, -0.9], ["USB-C Power In", -0.95, -0.8]]},
+    'step_list': {'template': 'step_list', 'title': "Making Tea",
+                  'steps': ["Boil the water", "Add the tea bag", "Steep for three minutes", "Remove the bag"]},
+    'equation_walkthrough': {'template': 'equation_walkthrough', 'title': "Solving a Linear Equation",
+                             'steps': [["2x + 3 = 7", "Start from the equation"], ["2x = 4", "Subtract 3"],
+                                       ["x = 2", "Divide by 2"]]},
+    'graph_plot': {'template': 'graph_plot', 'title': "Sine and Cosine", 'x_range': [-6.0, 6.0],
+                   'functions': [["sin(x)", "sin x"], ["cos(x)", "cos x"]]},
+}
+
+
+def compile_expression(expr):
+    """Turn an expression in x such as 'x**2 - 3*sin(x)' into a function of x.
+
+    The expression is parsed, never evaluated: only numbers, x, pi, e, arithmetic and the
+    FUNCTIONS are accepted, so LLM output cannot run code.
+    """
+    expr = str(expr).strip()
+    if not expr or len(expr) > EXPRESSION_CHARS:
+        raise ValueError(f"expression must be 1 to {EXPRESSION_CHARS} characters")
+    try:
+        tree = ast.parse(expr.replace('^', '**'), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"invalid expression {expr!r}: {e.msg}")
+
+    def build(node):
+        if isinstance(node, ast.Expression):
+            return build(node.body)
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            value = float(node.value)
+            return lambda x: value
+        if isinstance(node, ast.Name) and node.id == 'x':
+            return lambda x: x
+        if isinstance(node, ast.Name) and node.id in CONSTANTS:
+            value = CONSTANTS[node.id]
+            return lambda x: value
+        if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+            op, left, right = OPERATORS[type(node.op)], build(node.left), build(node.right)
+            return lambda x: op(left(x), right(x))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+            op, operand = OPERATORS[type(node.op)], build(node.operand)
+            return lambda x: op(operand(x))
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS
+                and len(node.args) == 1 and not node.keywords):
+            fn, arg = FUNCTIONS[node.func.id], build(node.args[0])
+            return lambda x: fn(arg(x))
+        raise ValueError(f"unsupported element {type(node).__name__} in {expr!r}")
+
+    return build(tree)
+
+
+def sample(fn, x_range, n=GRAPH_SAMPLES):
+    """(x, y) points of fn across x_range; raises ValueError where fn is undefined, not finite or jumps.
+
+    A jump is a step between neighbouring samples larger than MAX_JUMP of the whole y span, as
+    across a pole of tan(x) that falls between samples.
+    """
+    x_min, x_max = x_range
+    points = []
+    for i in range(n + 1):
+        x = x_min + (x_max - x_min) * i / n
+        try:
+            y = fn(x)
+        except (ArithmeticError, ValueError):
+            raise ValueError(f"undefined at x={x:.2f}")
+        if type(y) not in (int, float) or not math.isfinite(y):  # e.g. (-8) ** (1/3) is complex
+            raise ValueError(f"not finite at x={x:.2f}")
+        points.append((x, y))
+    ys = [y for _, y in points]
+    span = max(ys) - min(ys)
+    for (x, y), (_, next_y) in zip(points, points[1:]):
+        if abs(next_y - y) > MAX_JUMP * span:
+            raise ValueError(f"jumps at x={x:.2f}")
+    return points
+
+
+def check_latex(latex):
+    """Raise ValueError unless latex uses only LATEX_COMMANDS and LATEX_SYMBOLS with balanced braces"""
+    if '^^' in latex or '#' in latex:
+        raise ValueError(f"unsupported LaTeX in {latex!r}")
+    for match in LATEX_COMMAND.finditer(latex):
+        command = match.group(1)
+        if command not in LATEX_COMMANDS and command not in LATEX_SYMBOLS:
+            raise ValueError(f"unsupported LaTeX command \\{command} in {latex!r}")
+    depth = 0
+    for char in LATEX_COMMAND.sub('', latex):  # Escaped braces are not grouping
+        depth += {'{': 1, '}': -1}.get(char, 0)
+        if depth < 0:
+            break
+    if depth:
+        raise ValueError(f"unbalanced braces in {latex!r}")
+
+
+def _text(value, limit):
+    text = ' '.join(str(value).split())
+    if not text:
+        raise ValueError("empty text")
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + '…'
+
+
+def _items(spec, key, limit):
+    items = spec.get(key)
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"{key} must be a non-empty list")
+    return items[:limit]
+
+
+def _number(value, low, high):
+    if type(value) not in (int, float) or not math.isfinite(value):
+        raise ValueError(f"{value!r} is not a number")
+    return min(max(float(value), low), high)
+
+
+def _pair(item, key):
+    if not isinstance(item, (list, tuple)) or len(item) < 2:
+        raise ValueError(f"each entry of {key} must be a list")
+    return item
+
+
+def validate_spec(spec):
+    """Check a scene spec against its template and return a cleaned copy; raises ValueError.
+
+    Texts are trimmed to what fits on screen, coordinates clamped, LaTeX screened and graph
+    functions sampled, so a spec that passes renders.
+    """
+    if not isinstance(spec, dict) or spec.get('template') not in SCENES:
+        raise ValueError(f"unknown template {spec.get('template') if isinstance(spec, dict) else spec!r}")
+    template = spec['template']
+    clean = {'template': template,
+             'title': _text(spec.get('title') or template.replace('_', ' ').title(), TITLE_CHARS)}
+    if template == 'labelled_diagram':
+        clean['shape'] = 'circle' if spec.get('shape') == 'circle' else 'rectangle'
+        clean['parts'] = []
+        for part in _items(spec, 'parts', MAX_PARTS):
+            if not isinstance(part, (list, tuple)) or len(part) < 3:
+                raise ValueError("each part must be [label, x, y]")
+            clean['parts'].append([_text(part[0], LABEL_CHARS), _number(part[1], -1, 1), _number(part[2], -1, 1)])
+    elif template == 'step_list':
+        clean['steps'] = [_text(step, STEP_CHARS) for step in _items(spec, 'steps', MAX_STEPS)]
+    elif template == 'equation_walkthrough':
+        clean['steps'] = []
+        for step in _items(spec, 'steps', MAX_STEPS):
+            latex, note = _pair(step, 'steps')[:2]
+            latex = str(latex).strip()
+            if not latex or len(latex) > LATEX_CHARS:
+                raise ValueError(f"equation must be 1 to {LATEX_CHARS} characters")
+            check_latex(latex)
+            clean['steps'].append([latex, _text(note, STEP_CHARS)])
+    else:
+        x_range = spec.get('x_range') or [-5, 5]
+        if not isinstance(x_range, (list, tuple)) or len(x_range) != 2:
+            raise ValueError("x_range must be [min, max]")
+        x_min, x_max = _number(x_range[0], -100, 100), _number(x_range[1], -100, 100)
+        if x_max <= x_min:
+            raise ValueError("x_range must be [min, max] with min < max")
+        clean['x_range'] = [x_min, x_max]
+        clean['functions'] = []
+        for function in _items(spec, 'functions', MAX_FUNCTIONS):
+            expr, label = _pair(function, 'functions')[:2]
+            sample(compile_expression(expr), clean['x_range'])
+            clean['functions'].append([str(expr).strip(), _text(label, LABEL_CHARS)])
+    return clean
+
+
+def fallback_spec(topic, text=""):
+    """Step list of the first sentences of text, for when the LLM's spec is unusable"""
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s] or [f"What is {topic}?"]
+    return validate_spec({'template': 'step_list', 'title': topic.title(), 'steps': sentences[:MAX_STEPS]})
+
+
+def load_spec(template):
+    """The spec named by SPEC_ENV, or the template's example when rendering by hand"""
+    path = os.environ.get(SPEC_ENV)
+    if not path:
+        return EXAMPLES[template]
+    with open(path) as f:
+        return validate_spec(json.load(f))
+
+
+def _fit(mobject, width, height=None):
+    if mobject.width > width:
+        mobject.scale_to_fit_width(width)
+    if height and mobject.height > height:
+        mobject.scale_to_fit_height(height)
+    return mobject
+
+
+def _nice_step(span, ticks=8):
+    """A 1, 2 or 5 times a power of ten step giving about ticks ticks over span"""
+    raw = span / ticks
+    power = 10 ** math.floor(math.log10(raw))
+    return next(power * m for m in (1, 2, 5, 10) if power * m >= raw)
+
+
+class TemplateScene(abc.ABC):
+    """Title, the template's body from the spec, outro; mixed into a Scene by each template.
+
+    Not a Scene itself, so manim never offers it as a scene to render. The body hook is not
+    called render, which is Scene's own entry point.
+    """
+    template = None
+
+    def construct(self):
+        spec = load_spec(self.template)
+        title = _fit(Text(spec['title'], font_size=36), 12).to_edge(UP)
+        self.play(Write(title))
+        self.wait(1)
+        self.animate_spec(spec)
+        self.wait(2)
+        self.play(*[FadeOut(mob) for mob in self.mobjects])
+
+    @abc.abstractmethod
+    def animate_spec(self, spec):
+        """Animate the template's body below the title"""
+
+
+class LabelledDiagram(TemplateScene, Scene):
+    template = 'labelled_diagram'
+
+    def animate_spec(self, spec):
+        if spec['shape'] == 'circle':
+            body = Circle(radius=1.8, color=GREEN).shift(DOWN * 0.5)
+            reach = (1.3, 1.3)
+        else:
+            body = Rectangle(width=6, height=3.5, color=GREEN).shift(DOWN * 0.5)
+            reach = (2.7, 1.5)
+        self.play(Create(body))
+
+        # Labels go on the side of their part, spread evenly top to bottom so they never overlap
+        sides = {'left': [], 'right': []}
+        for i, (label, x, y) in enumerate(spec['parts']):
+            sides['right' if x >= 0 else 'left'].append((y, i, label, x))
+        for side, parts in sides.items():
+            parts.sort(reverse=True)
+            for slot, (y, i, label_text, x) in enumerate(parts):
+                shape = Square(side_length=0.4, fill_color=PALETTE[i % len(PALETTE)], fill_opacity=0.8)
+                shape.move_to(body.get_center() + RIGHT * x * reach[0] + UP * y * reach[1])
+                label_y = 2 - 5 * (slot + 0.5) / len(parts)
+                label = _fit(Text(label_text, font_size=18), 3).move_to(
+                    (RIGHT if side == 'right' else LEFT) * 5 + UP * label_y)
+
+                # Draw an arrow from label to shape center
+                arrow = Arrow(start=label.get_center(), end=shape.get_center(), buff=0.1, stroke_width=2)
+                self.play(FadeIn(shape), Write(label), GrowArrow(arrow))
+                self.wait(0.4)
+
+
+class StepList(TemplateScene, Scene):
+    template = 'step_list'
+
+    def animate_spec(self, spec):
+        steps = VGroup(*[Text(f"{n}. {step}", font_size=28) for n, step in enumerate(spec['steps'], 1)])
+        steps.arrange(DOWN, aligned_edge=LEFT, buff=0.4)
+        _fit(steps, 12, 5.5).shift(DOWN * 0.5)
+        for step in steps:
+            self.play(Write(step))
+            self.wait(0.8)
+
+
+class EquationWalkthrough(TemplateScene, Scene):
+    template = 'equation_walkthrough'
+
+    def animate_spec(self, spec):
+        equation = note = None
+        for latex, note_text in spec['steps']:
+            try:
+                next_equation = MathTex(latex, font_size=48)
+            except Exception as e:
+                # LaTeX the validator could not catch; show it as plain text rather than fail the render
+                print(f"Could not typeset {latex!r}: {e}")
+                next_equation = Text(latex, font_size=36)
+            next_equation = _fit(next_equation, 12).move_to(UP * 0.3)
+            next_note = _fit(Text(note_text, font_size=24, color=YELLOW), 12).next_to(next_equation, DOWN, buff=0.6)
+            if equation is None:
+                self.play(Write(next_equation), FadeIn(next_note))
+            else:
+                self.play(ReplacementTransform(equation, next_equation), FadeOut(note), FadeIn(next_note))
+            equation, note = next_equation, next_note
+            self.wait(1.5)
+
+
+class GraphPlot(TemplateScene, Scene):
+    template = 'graph_plot'
+
+    def animate_spec(self, spec):
+        x_min, x_max = spec['x_range']
+        functions = [(compile_expression(expr), label) for expr, label in spec['functions']]
+        ys = [y for fn, _ in functions for _, y in sample(fn, spec['x_range'])]
+        y_min, y_max = min(ys + [0.0]), max(ys + [0.0])
+        if y_max - y_min < 1e-6:
+            y_min, y_max = y_min - 1, y_max + 1
+        pad = (y_max - y_min) * 0.1
+        y_min, y_max = y_min - pad, y_max + pad
+
+        axes = Axes(x_range=[x_min, x_max, _nice_step(x_max - x_min)],
+                    y_range=[y_min, y_max, _nice_step(y_max - y_min)],
+                    x_length=10, y_length=5, tips=False, axis_config={'include_numbers': True, 'font_size': 20})
+        axes.shift(DOWN * 0.5)
+        self.play(Create(axes))
+        for i, (fn, label_text) in enumerate(functions):
+            color = PALETTE[i % len(PALETTE)]
+            graph = axes.plot(lambda x, fn=fn: min(max(fn(x), y_min), y_max),
+                              x_range=[x_min, x_max, (x_max - x_min) / GRAPH_SAMPLES], color=color)
+            label = axes.get_graph_label(graph, Text(label_text, font_size=24, color=color), x_val=x_max,
+                                         direction=UP if i % 2 == 0 else DOWN)
+            self.play(Create(graph), Write(label))
+            self.wait(0.8)
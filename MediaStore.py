@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import cv2
+
+
+MEDIA_ROOT = os.path.join("static", "media")
+WORK_DIR = "work"
+THUMBNAIL_WIDTH = 320
+
+
+def new_job_id():
+    """Short unique id used to keep the working files of concurrent jobs apart"""
+    return uuid.uuid4().hex[:12]
+
+
+def work_path(job_id, name):
+    """Job-specific working file path, e.g. work/<job>_voiceover.mp3"""
+    os.makedirs(WORK_DIR, exist_ok=True)
+    return os.path.join(WORK_DIR, f"{job_id}_{name}")
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _video_info(path):
+    """(duration in seconds, middle frame) of a video, either may be None"""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    duration = frames / fps if fps and frames else None
+    if frames:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frames // 2)
+    ret, frame = cap.read()
+    cap.release()
+    return duration, frame if ret else None
+
+
+class MediaStore:
+    """Content-addressed library of generated media under static/media.
+
+    Each artifact is stored once as <sha256 prefix><ext> and never rewritten, so its URL can be
+    cached forever. index.json records kind, topic, creation time, duration, size and thumbnail.
+    Retention drops the oldest items beyond max_items, max_bytes or max_age, always keeping
+    the newest item of each kind. Only the assistant writes; readers reload the index on change.
+    """
+
+    def __init__(self, root=MEDIA_ROOT, max_items=100, max_bytes=2 * 1024 ** 3, max_age=30 * 24 * 3600):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.json')
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.index_mtime = None
+        os.makedirs(root, exist_ok=True)
+        self._reload()
+
+    def _reload(self):
+        """Re-read index.json if another process changed it"""
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except OSError:
+            return
+        if mtime == self.index_mtime:
+            return
+        try:
+            with open(self.index_path) as f:
+                self.entries = json.load(f)
+            self.index_mtime = mtime
+        except (OSError, ValueError) as e:
+            print(f"Could not read media index: {e}")
+
+    def _save(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+        self.index_mtime = os.path.getmtime(self.index_path)
+
+    def add(self, path, kind, topic=None, duration=None, move=True):
+        """Store a finished artifact and return its index entry; identical content is stored once"""
+        digest = file_digest(path)
+        name = digest[:16] + os.path.splitext(path)[1].lower()
+        dest = os.path.join(self.root, name)
+        with self.lock:
+            self._reload()
+            if digest in self.entries:
+                entry = self.entries[digest]
+                entry['created'] = time.time()  # Counts as new for "latest" and retention
+                if move:
+                    os.remove(path)
+            else:
+                # Copy to a temporary name first so a reader never sees a partial file
+                tmp_path = dest + '.part'
+                if move:
+                    shutil.move(path, tmp_path)
+                else:
+                    shutil.copyfile(path, tmp_path)
+                os.replace(tmp_path, dest)
+                entry = {'digest': digest, 'file': name, 'kind': kind, 'topic': topic, 'created': time.time(),
+                         'size': os.path.getsize(dest), 'duration': duration, 'thumbnail': None}
+                self._describe(entry, dest)
+                self.entries[digest] = entry
+            self._enforce_retention()
+            self._save()
+            return dict(entry)
+
+    def _describe(self, entry, path):
+        """Fill in duration and thumbnail for videos and images"""
+        try:
+            if entry['kind'] == 'video':
+                duration, frame = _video_info(path)
+                entry['duration'] = entry['duration'] or duration
+            elif entry['kind'] == 'image':
+                frame = cv2.imread(path)
+            else:
+                return
+            if frame is None:
+                return
+            h, w = frame.shape[:2]
+            thumbnail = cv2.resize(frame, (THUMBNAIL_WIDTH, max(1, round(h * THUMBNAIL_WIDTH / w))),
+                                   interpolation=cv2.INTER_AREA)
+            entry['thumbnail'] = entry['digest'][:16] + '_thumb.jpg'
+            cv2.imwrite(os.path.join(self.root, entry['thumbnail']), thumbnail)
+        except Exception as e:
+            print(f"Could not describe {path}: {e}")
+
+    def _remove(self, digest):
+        entry = self.entries.pop(digest)
+        for name in (entry['file'], entry['thumbnail']):
+            if name:
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError:
+                    pass
+
+    def _enforce_retention(self):
+        now = time.time()
+        newest = {}
+        for digest, entry in self.entries.items():
+            if entry['kind'] not in newest or entry['created'] > self.entries[newest[entry['kind']]]['created']:
+                newest[entry['kind']] = digest
+        keep = set(newest.values())
+        oldest_first = sorted(self.entries, key=lambda d: self.entries[d]['created'])
+        total = sum(entry['size'] for entry in self.entries.values())
+        for digest in oldest_first:
+            if digest in keep:
+                continue
+            entry = self.entries[digest]
+            if (now - entry['created'] > self.max_age or len(self.entries) > self.max_items
+                    or total > self.max_bytes):
+                total -= entry['size']
+                self._remove(digest)
+
+    def latest(self, kind):
+        """Newest entry of a kind, or None"""
+        with self.lock:
+            self._reload()
+            entries = [e for e in self.entries.values() if e['kind'] == kind]
+        return dict(max(entries, key=lambda e: e['created'])) if entries else None
+
+    def path(self, entry):
+        return os.path.join(self.root, entry['file'])
+
+    def list(self, kind=None):
+        """Entries newest first, optionally of one kind"""
+        with self.lock:
+            self._reload()
+            entries = [dict(e) for e in self.entries.values() if kind is None or e['kind'] == kind]
+        return sorted(entries, key=lambda e: e['created'], reverse=True)
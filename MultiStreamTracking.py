@@ -0,0 +1,230 @@
+import cv2
+import threading
+import time
+import numpy as np
+
+from YOLOBackends import DETECTION_DTYPE, get_shared_backend
+from YOLOTracking import FrameMailbox, SnapshotPublisher
+from TrackerMetrics import TrackerMetrics
+
+
+MAX_FAILED_REWINDS = 3  # A file that cannot be read right after rewinding is given up on
+
+class VideoStream:
+    """One camera, video file or network source feeding a latest-frame mailbox"""
+
+    def __init__(self, stream_id, source):
+        self.stream_id = stream_id
+        self.source = source
+        self.mailbox = FrameMailbox()
+        self.publisher = SnapshotPublisher()
+        self.snapshot = None
+        self.thread = None
+        self.metrics = TrackerMetrics()
+
+    def grab_loop(self, manager):
+        """Thread function that keeps draining the source into the mailbox"""
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print(f"Could not open source {self.source!r} for stream {self.stream_id}")
+            return
+        # Files are played back at their own frame rate and looped, like a live camera
+        is_file = isinstance(self.source, str) and not self.source.startswith(("rtsp://", "http://", "https://"))
+        frame_interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if is_file else 0.0
+        next_frame_at = time.time()
+        failed_rewinds = 0
+
+        while manager.running:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                if is_file:
+                    # End of file: loop, unless reading fails again straight after rewinding
+                    failed_rewinds += 1
+                    if failed_rewinds > MAX_FAILED_REWINDS:
+                        print(f"Giving up on stream {self.stream_id}: {self.source!r} cannot be read")
+                        break
+                    if failed_rewinds > 1:
+                        time.sleep(0.1 * failed_rewinds)
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    next_frame_at = time.time()
+                    continue
+                print(f"Failed to capture frame from stream {self.stream_id}")
+                time.sleep(0.1)
+                continue
+            failed_rewinds = 0
+            self.metrics.observe('grab', time.perf_counter() - start)
+            self.mailbox.put(frame, time.time())
+            self.metrics.count('frames_grabbed')
+            manager.frame_ready.set()
+
+            if frame_interval:
+                next_frame_at += frame_interval
+                time.sleep(max(0.0, next_frame_at - time.time()))
+
+        cap.release()
+        print(f"Grab thread for stream {self.stream_id} stopped")
+
+    def publish(self, frame, detections, objects, grabbed_at, inference_seconds):
+        """Publish a new snapshot and update the stream metrics"""
+        start = time.perf_counter()
+        self.snapshot = self.publisher.publish(frame, detections, objects, grabbed_at)
+        self.metrics.observe('postprocess', time.perf_counter() - start)
+        self.metrics.observe('inference', inference_seconds)
+        self.metrics.count('inferences')
+        self.metrics.frame_published(grabbed_at)
+        self.metrics.counters['frames_dropped'] = self.mailbox.dropped
+
+
+class MultiStreamTracker:
+    """Track several video sources with one shared model and batched inference"""
+
+    def __init__(self, sources, model_path="yolov8n.pt", conf_threshold=0.5, classes=None,
+                 max_det=50, max_batch=8, backend='torch', imgsz=640, threads=None):
+        if not isinstance(sources, dict):
+            sources = {str(i): source for i, source in enumerate(sources)}
+        self.streams = {stream_id: VideoStream(stream_id, source) for stream_id, source in sources.items()}
+        self.backend = get_shared_backend(backend, model_path, imgsz, threads)
+        self.class_names = self.backend.class_names
+        self.conf_threshold = conf_threshold
+        self.classes = classes
+        self.max_det = max_det
+        self.max_batch = max_batch
+        self.running = False
+        self.thread = None
+        self.frame_ready = threading.Event()
+        self.stats = {'batches': 0, 'frames': 0, 'avg_batch_size': 0.0, 'avg_inference_ms': 0.0,
+                      'frames_per_second': 0.0}
+
+    def collect_batch(self):
+        """Take the freshest unprocessed frame from each stream, up to max_batch streams"""
+        batch = []
+        for stream in self.streams.values():
+            item = stream.mailbox.take(timeout=0)
+            if item is not None:
+                batch.append((stream, item[1], item[2]))
+                if len(batch) == self.max_batch:
+                    break
+        return batch
+
+    def inference_loop(self):
+        """Thread function that runs one batched inference call per round"""
+        started = time.time()
+
+        while self.running:
+            self.frame_ready.wait(timeout=0.5)
+            self.frame_ready.clear()
+            batch = self.collect_batch()
+            if not batch:
+                continue
+
+            try:
+                start = time.perf_counter()
+                results = self.backend.predict([frame for _, frame, _ in batch], conf=self.conf_threshold,
+                                                classes=self.classes, max_det=self.max_det)
+                inference_seconds = time.perf_counter() - start
+                inference_ms = inference_seconds * 1000
+
+                for (stream, frame, grabbed_at), detections in zip(batch, results):
+                    stream.publish(frame, detections, self.class_names[detections['cls']].tolist(), grabbed_at,
+                                   inference_seconds)
+
+                self.stats['batches'] += 1
+                self.stats['frames'] += len(batch)
+                self.stats['avg_batch_size'] += 0.1 * (len(batch) - self.stats['avg_batch_size'])
+                self.stats['avg_inference_ms'] += 0.1 * (inference_ms - self.stats['avg_inference_ms'])
+                self.stats['frames_per_second'] = self.stats['frames'] / max(time.time() - started, 1e-6)
+            except Exception as e:
+                print(f"Error processing batch: {e}")
+
+            # Streams that were left out of a full batch go first next round
+            if len(batch) == self.max_batch:
+                self.frame_ready.set()
+
+        print("Multi-stream inference thread stopped")
+
+    def start(self):
+        """Start a grab thread per stream and the shared inference thread"""
+        if self.thread is None or not self.thread.is_alive():
+            self.running = True
+            for stream in self.streams.values():
+                stream.thread = threading.Thread(target=stream.grab_loop, args=(self,), daemon=True)
+                stream.thread.start()
+            self.thread = threading.Thread(target=self.inference_loop, daemon=True)
+            self.thread.start()
+            return True
+        return False
+
+    def stop(self):
+        """Stop all streams"""
+        self.running = False
+        self.frame_ready.set()
+        for thread in [stream.thread for stream in self.streams.values()] + [self.thread]:
+            if thread and thread.is_alive():
+                thread.join(timeout=1.0)
+        self.thread = None
+
+    def get_latest_frame(self, stream_id):
+        """Get a copy of the latest processed frame of a stream; the snapshot's buffer is reused"""
+        snapshot = self.streams[stream_id].snapshot
+        return snapshot.processed_frame.copy() if snapshot else None
+
+    def get_detected_objects(self, stream_id):
+        """Get the latest detected objects of a stream as a list"""
+        snapshot = self.streams[stream_id].snapshot
+        return list(snapshot.objects) if snapshot else []
+
+    def get_detections(self, stream_id):
+        """Get the latest read-only DETECTION_DTYPE array of a stream"""
+        snapshot = self.streams[stream_id].snapshot
+        return snapshot.detections if snapshot else np.zeros(0, dtype=DETECTION_DTYPE)
+
+    def get_stats(self, stream_id=None):
+        """Get the metrics of one stream, or the batching stats and every stream's metrics"""
+        if stream_id is not None:
+            return self.streams[stream_id].metrics.snapshot()
+        return {'batching': dict(self.stats),
+                'streams': {sid: stream.metrics.snapshot() for sid, stream in self.streams.items()}}
+
+
+# Global multi-stream manager instance
+manager = None
+
+
+def MultiStreamTracking(sources, max_batch=8, backend='torch'):
+    """Initialize and start tracking on several sources, e.g. [0, 1, "rtsp://..."] or {"front": 0}"""
+    global manager
+    if manager is None:
+        manager = MultiStreamTracker(sources, max_batch=max_batch, backend=backend)
+
+    if not manager.start():
+        print("Multi-stream tracker already running")
+
+
+def StopMultiStreamTracking():
+    """Stop all streams"""
+    global manager
+    if manager:
+        manager.stop()
+        manager = None
+
+
+def GetLatestFrame(stream_id):
+    """Get the latest processed frame with detections for a stream"""
+    if manager and stream_id in manager.streams:
+        return manager.get_latest_frame(stream_id)
+    return None
+
+
+def GetDetectedObjects(stream_id):
+    """Get list of latest detected objects for a stream"""
+    if manager and stream_id in manager.streams:
+        return manager.get_detected_objects(stream_id)
+    return []
+
+
+def GetStreamStats(stream_id=None):
+    """Get per-stream and batching stats"""
+    if manager:
+        return manager.get_stats(stream_id)
+    return {}
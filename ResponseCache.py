@@ -0,0 +1,203 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+# Request phrasings that do not change what is being asked about
+FILLER_PHRASES = ("teach me about", "teach me", "learn about", "tell me about", "explain to me", "explain",
+                  "set up the", "set up", "i want to", "can you", "please")
+STOPWORDS = {"a", "an", "the", "me", "about", "of", "to", "on", "for", "and", "in", "how", "what", "is",
+             "are", "do", "does", "my", "i", "you", "learn", "teach", "some", "more"}
+
+
+def normalize(text):
+    """Lower-case, drop filler phrases, punctuation and stopwords, and strip plural endings"""
+    text = text.lower()
+    for phrase in FILLER_PHRASES:
+        text = text.replace(phrase, " ")
+    words = re.findall(r"[a-z0-9]+", text)
+    kept = [w for w in words if w not in STOPWORDS] or words
+    return " ".join(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in kept)
+
+
+def features(normalized):
+    """Word unigrams and bigrams plus character trigrams, so word order and small spelling changes matter little"""
+    words = normalized.split()
+    grams = Counter(words)
+    grams.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    padded = f" {normalized} "
+    grams.update(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return grams
+
+
+class CacheEntry:
+    __slots__ = ('namespace', 'prompt', 'normalized', 'features', 'answer', 'created', 'hits')
+
+    def __init__(self, namespace, prompt, normalized, answer, created, hits=0):
+        self.namespace = namespace
+        self.prompt = prompt
+        self.normalized = normalized
+        self.features = features(normalized)
+        self.answer = answer
+        self.created = created
+        self.hits = hits
+
+
+class ResponseCache:
+    """Local cache of LLM answers looked up by TF-IDF cosine similarity of normalized prompts.
+
+    Entries live in namespaces, one per kind of request. An inverted index maps each feature to
+    the entries containing it, so a lookup only scores entries sharing at least one feature with
+    the prompt. Entries expire after ttl seconds and the least recently used are evicted beyond
+    max_entries. With a path the cache persists as JSON.
+    """
+
+    def __init__(self, path=None, threshold=0.75, ttl=7 * 24 * 3600, max_entries=500):
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # id -> CacheEntry, least recently used first
+        self.index = {}               # (namespace, feature) -> set of entry ids
+        self.exact = {}               # (namespace, normalized prompt) -> entry id
+        self.next_id = 0
+        self.stats_counts = {'lookups': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+        self.lookup_seconds = 0.0
+        if path and os.path.exists(path):
+            self.load()
+
+    def _add(self, entry):
+        entry_id = self.next_id
+        self.next_id += 1
+        self.entries[entry_id] = entry
+        self.exact[(entry.namespace, entry.normalized)] = entry_id
+        for feature in entry.features:
+            self.index.setdefault((entry.namespace, feature), set()).add(entry_id)
+        return entry_id
+
+    def _remove(self, entry_id):
+        entry = self.entries.pop(entry_id)
+        if self.exact.get((entry.namespace, entry.normalized)) == entry_id:
+            del self.exact[(entry.namespace, entry.normalized)]
+        for feature in entry.features:
+            postings = self.index.get((entry.namespace, feature))
+            if postings is not None:
+                postings.discard(entry_id)
+                if not postings:
+                    del self.index[(entry.namespace, feature)]
+
+    def _idf(self, namespace, feature):
+        return math.log((len(self.entries) + 1) / (len(self.index.get((namespace, feature), ())) + 1)) + 1
+
+    def _vector(self, namespace, grams):
+        vector = {f: count * self._idf(namespace, f) for f, count in grams.items()}
+        return vector, math.sqrt(sum(w * w for w in vector.values()))
+
+    def get(self, namespace, prompt):
+        """Stored answer for a similar enough prompt in namespace, or None"""
+        start = time.perf_counter()
+        normalized = normalize(prompt)
+        now = time.time()
+        with self.lock:
+            self.stats_counts['lookups'] += 1
+            entry_id = self.exact.get((namespace, normalized))
+            if entry_id is None:
+                entry_id = self._best_match(namespace, normalized)
+            if entry_id is not None and now - self.entries[entry_id].created > self.ttl:
+                self._remove(entry_id)
+                self.stats_counts['expired'] += 1
+                entry_id = None
+            if entry_id is None:
+                self.stats_counts['misses'] += 1
+                self.lookup_seconds += time.perf_counter() - start
+                return None
+            entry = self.entries[entry_id]
+            entry.hits += 1
+            self.entries.move_to_end(entry_id)
+            self.stats_counts['hits'] += 1
+            self.lookup_seconds += time.perf_counter() - start
+            return entry.answer
+
+    def _best_match(self, namespace, normalized):
+        grams = features(normalized)
+        candidates = set()
+        for feature in grams:
+            candidates |= self.index.get((namespace, feature), set())
+        if not candidates:
+            return None
+        query, query_norm = self._vector(namespace, grams)
+        best_id, best_score = None, self.threshold
+        for entry_id in candidates:
+            vector, norm = self._vector(namespace, self.entries[entry_id].features)
+            score = sum(w * vector.get(f, 0.0) for f, w in query.items()) / (query_norm * norm or 1.0)
+            if score >= best_score:
+                best_id, best_score = entry_id, score
+        return best_id
+
+    def put(self, namespace, prompt, answer):
+        """Store an answer, replacing one for the same normalized prompt, and evict beyond max_entries"""
+        entry = CacheEntry(namespace, prompt, normalize(prompt), answer, time.time())
+        with self.lock:
+            old_id = self.exact.get((namespace, entry.normalized))
+            if old_id is not None:
+                self._remove(old_id)
+            self._add(entry)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.stats_counts['evictions'] += 1
+        if self.path:
+            self.save()
+
+    def stats(self):
+        """Counters plus hit rate and average lookup time"""
+        with self.lock:
+            stats = dict(self.stats_counts, entries=len(self.entries))
+            lookups = stats['lookups']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+            stats['avg_lookup_ms'] = self.lookup_seconds * 1000 / lookups if lookups else 0.0
+        return stats
+
+    def save(self):
+        with self.lock:
+            data = [{'namespace': e.namespace, 'prompt': e.prompt, 'answer': e.answer,
+                     'created': e.created, 'hits': e.hits} for e in self.entries.values()]
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Load saved entries, skipping expired ones"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not load response cache {self.path}: {e}")
+            return
+        now = time.time()
+        with self.lock:
+            for item in data:
+                if now - item['created'] <= self.ttl:
+                    self._add(CacheEntry(item['namespace'], item['prompt'], normalize(item['prompt']),
+                                         item['answer'], item['created'], item.get('hits', 0)))
+
+
+CACHE_GAUGES = ('entries', 'hit_rate', 'avg_lookup_ms')
+
+
+def render_cache_prometheus(stats, prefix='learnitlive_response_cache'):
+    """Render cache stats() (ResponseCache or VisionCache) in the Prometheus text exposition format"""
+    lines = []
+    for name, value in stats.items():
+        if name in CACHE_GAUGES:
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        else:
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,107 @@
+import bisect
+import time
+from collections import deque
+
+
+# Histogram bucket upper bounds in seconds, from 1 ms to 2 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; each one is written by a single thread, so no lock is needed"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        """Cumulative (upper bound, count) pairs plus sum and count"""
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), list(self.counts)):
+            total += count
+            cumulative.append((bound, total))
+        return {'buckets': cumulative, 'sum': self.sum, 'count': self.count}
+
+
+class TrackerMetrics:
+    """Per-stage counters, gauges and latency histograms for one tracked stream"""
+
+    COUNTERS = ('frames_grabbed', 'frames_processed', 'frames_dropped', 'inferences', 'gate_skips')
+    STAGES = ('grab', 'inference', 'postprocess', 'frame_age')
+
+    def __init__(self, fps_window=60):
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.gauges = {'fps': 0.0, 'latency_seconds': 0.0, 'gate_ratio': 0.0, 'inference_seconds_saved': 0.0}
+        self.histograms = {stage: Histogram() for stage in self.STAGES}
+        self.publish_times = deque(maxlen=fps_window)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def set(self, name, value):
+        self.gauges[name] = value
+
+    def observe(self, stage, seconds):
+        self.histograms[stage].observe(seconds)
+
+    def frame_published(self, grabbed_at):
+        """Record the end-to-end age of a published frame and update the effective FPS"""
+        now = time.time()
+        self.counters['frames_processed'] += 1
+        self.observe('frame_age', now - grabbed_at)
+        self.gauges['latency_seconds'] = now - grabbed_at
+        self.publish_times.append(now)
+        if len(self.publish_times) > 1:
+            span = self.publish_times[-1] - self.publish_times[0]
+            self.gauges['fps'] = (len(self.publish_times) - 1) / span if span > 0 else 0.0
+
+    def snapshot(self):
+        """Plain-data copy of every metric"""
+        return {'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'histograms': {stage: h.snapshot() for stage, h in self.histograms.items()}}
+
+
+def _labels(labels):
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+def render_prometheus(snapshots, prefix='learnitlive_tracker'):
+    """Render {stream_id: TrackerMetrics.snapshot()} in the Prometheus text exposition format"""
+    lines = []
+    if not snapshots:
+        return ''
+    first = next(iter(snapshots.values()))
+
+    for name in first['counters']:
+        metric = f"{prefix}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for stream, snap in snapshots.items():
+            lines.append(f"{metric}{_labels({'stream': stream})} {snap['counters'][name]}")
+
+    for name in first['gauges']:
+        metric = f"{prefix}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        for stream, snap in snapshots.items():
+            lines.append(f"{metric}{_labels({'stream': stream})} {snap['gauges'][name]}")
+
+    for stage in first['histograms']:
+        metric = f"{prefix}_{stage}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for stream, snap in snapshots.items():
+            histogram = snap['histograms'][stage]
+            for bound, count in histogram['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{metric}_bucket{_labels({'stream': stream, 'le': le})} {count}")
+            lines.append(f"{metric}_sum{_labels({'stream': stream})} {histogram['sum']}")
+            lines.append(f"{metric}_count{_labels({'stream': stream})} {histogram['count']}")
+
+    return '\n'.join(lines) + '\n'
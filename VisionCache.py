@@ -0,0 +1,176 @@
+import itertools
+import math
+import threading
+import time
+import cv2
+from ResponseCache import normalize, features
+
+
+HASH_BITS = 64
+CHUNKS = 4                       # The 64-bit hash is indexed as four 16-bit chunks
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def dhash(image, crop=1.0):
+    """64-bit difference hash: is each pixel brighter than its right neighbour on a 9x8 thumbnail.
+
+    Robust to exposure, scaling and JPEG noise; small when the scene is unchanged. crop below 1
+    hashes only that central fraction of the width and height.
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if crop < 1.0:
+        h, w = gray.shape[:2]
+        ch, cw = max(1, int(h * crop)), max(1, int(w * crop))
+        y0, x0 = (h - ch) // 2, (w - cw) // 2
+        gray = gray[y0:y0 + ch, x0:x0 + cw]
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    value = 0
+    for bit in bits.tolist():
+        value = (value << 1) | bit
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _chunks(value):
+    return [(value >> (i * CHUNK_BITS)) & CHUNK_MASK for i in range(CHUNKS)]
+
+
+def _cosine(a, b):
+    dot = sum(count * b.get(f, 0) for f, count in a.items())
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class VisionEntry:
+    __slots__ = ('image_hash', 'prompt', 'features', 'answer', 'created', 'confidence', 'reuses')
+
+    def __init__(self, image_hash, prompt, answer):
+        self.image_hash = image_hash
+        self.prompt = prompt
+        self.features = features(normalize(prompt))
+        self.answer = answer
+        self.created = time.time()
+        self.confidence = 1.0
+        self.reuses = 0
+
+
+class VisionCache:
+    """Reuse vision answers for near-identical frames asked near-identical questions.
+
+    Frames are keyed by a 64-bit dHash in a multi-index: one table per 16-bit chunk. Two hashes
+    within max_distance bits agree on some chunk to within max_distance // CHUNKS bits
+    (pigeonhole), so a lookup probes only those chunk values instead of scanning every entry.
+
+    With crop below 1 only the centre of each frame is hashed, so a change where the subject
+    is (a different object in hand) is not drowned out by an unchanged background.
+
+    Confidence bookkeeping: a fresh answer starts at 1.0 and loses reuse_decay per reuse; a hit
+    is scaled down by how far the frame and the prompt are from the stored ones. Hits below
+    min_confidence, entries past max_reuses and entries older than ttl go back to the API.
+    """
+
+    def __init__(self, max_distance=6, prompt_threshold=0.6, ttl=600, max_entries=200,
+                 max_reuses=5, reuse_decay=0.9, min_confidence=0.5, crop=1.0):
+        self.max_distance = max_distance
+        self.crop = crop
+        self.chunk_radius = max_distance // CHUNKS
+        self.prompt_threshold = prompt_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_reuses = max_reuses
+        self.reuse_decay = reuse_decay
+        self.min_confidence = min_confidence
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.tables = [{} for _ in range(CHUNKS)]
+        self.next_id = 0
+        self.stats_counts = {'lookups': 0, 'hits': 0, 'near_hits': 0, 'misses': 0, 'expired': 0,
+                             'low_confidence': 0}
+
+    def _probe_values(self, chunk):
+        """chunk plus every value within chunk_radius bits of it"""
+        yield chunk
+        for radius in range(1, self.chunk_radius + 1):
+            for bits in itertools.combinations(range(CHUNK_BITS), radius):
+                flipped = chunk
+                for bit in bits:
+                    flipped ^= 1 << bit
+                yield flipped
+
+    def _candidates(self, image_hash):
+        candidates = set()
+        for table, chunk in zip(self.tables, _chunks(image_hash)):
+            for value in self._probe_values(chunk):
+                candidates |= table.get(value, set())
+        return candidates
+
+    def _remove(self, entry_id):
+        entry = self.entries.pop(entry_id)
+        for table, chunk in zip(self.tables, _chunks(entry.image_hash)):
+            ids = table.get(chunk)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del table[chunk]
+
+    def lookup(self, image, prompt):
+        """Cached answer for this frame and question, or None; returns (answer, confidence, distance)"""
+        image_hash = dhash(image, self.crop)
+        query = features(normalize(prompt))
+        now = time.time()
+        with self.lock:
+            self.stats_counts['lookups'] += 1
+            best = None
+            for entry_id in self._candidates(image_hash):
+                entry = self.entries[entry_id]
+                if now - entry.created > self.ttl:
+                    self._remove(entry_id)
+                    self.stats_counts['expired'] += 1
+                    continue
+                distance = hamming(image_hash, entry.image_hash)
+                if distance > self.max_distance or entry.reuses >= self.max_reuses:
+                    continue
+                similarity = _cosine(query, entry.features)
+                if similarity < self.prompt_threshold:
+                    continue
+                confidence = entry.confidence * (1 - distance / (HASH_BITS / 4)) * similarity
+                if best is None or confidence > best[1]:
+                    best = (entry_id, confidence, distance)
+            if best is None:
+                self.stats_counts['misses'] += 1
+                return None
+            entry_id, confidence, distance = best
+            if confidence < self.min_confidence:
+                self.stats_counts['low_confidence'] += 1
+                self.stats_counts['misses'] += 1
+                return None
+            entry = self.entries[entry_id]
+            entry.reuses += 1
+            entry.confidence *= self.reuse_decay
+            self.stats_counts['hits'] += 1
+            if distance:
+                self.stats_counts['near_hits'] += 1
+            return entry.answer, confidence, distance
+
+    def store(self, image, prompt, answer):
+        """Remember a fresh answer from the API for this frame and question"""
+        entry = VisionEntry(dhash(image, self.crop), prompt, answer)
+        with self.lock:
+            entry_id = self.next_id
+            self.next_id += 1
+            self.entries[entry_id] = entry
+            for table, chunk in zip(self.tables, _chunks(entry.image_hash)):
+                table.setdefault(chunk, set()).add(entry_id)
+            while len(self.entries) > self.max_entries:
+                self._remove(min(self.entries, key=lambda i: self.entries[i].created))
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.stats_counts, entries=len(self.entries))
+        stats['hit_rate'] = stats['hits'] / stats['lookups'] if stats['lookups'] else 0.0
+        return stats
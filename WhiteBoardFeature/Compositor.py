@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+
+
+INK_THRESHOLD = 50  # Canvas pixels brighter than this in grayscale hide the camera image
+TILE_SIZE = 80      # 1280x720 splits into 16 x 9 tiles
+
+
+class CanvasCompositor:
+    """Blend the ink canvas over camera frames, doing per-pixel work only where ink has been drawn"""
+
+    def __init__(self, width=1280, height=720, tile_size=TILE_SIZE, alpha=0.7):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.alpha = alpha
+        self.canvas = np.zeros((height, width, 3), np.uint8)
+        # Cached inverse ink mask: 0 where the canvas has ink, 255 elsewhere
+        self.inv_mask = np.full((height, width, 3), 255, np.uint8)
+        self.inked_tiles = np.zeros((-(-height // tile_size), -(-width // tile_size)), bool)
+        # Preallocated output and scratch buffers, reused every frame
+        self.output = np.empty((height, width, 3), np.uint8)
+        self.scratch = np.empty((height, width, 3), np.uint8)
+
+    def draw_line(self, p1, p2, color, thickness):
+        """Draw a stroke segment on the canvas and refresh the mask inside its bounding box"""
+        cv2.line(self.canvas, p1, p2, color, thickness)
+        pad = thickness // 2 + 2
+        x0 = max(min(p1[0], p2[0]) - pad, 0)
+        y0 = max(min(p1[1], p2[1]) - pad, 0)
+        x1 = min(max(p1[0], p2[0]) + pad + 1, self.width)
+        y1 = min(max(p1[1], p2[1]) + pad + 1, self.height)
+        if x0 < x1 and y0 < y1:
+            self.update_region(x0, y0, x1, y1)
+
+    def update_region(self, x0, y0, x1, y1):
+        """Recompute the ink mask for a canvas rectangle after it was drawn on"""
+        gray = cv2.cvtColor(self.canvas[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+        _, inv = cv2.threshold(gray, INK_THRESHOLD, 255, cv2.THRESH_BINARY_INV)
+        self.inv_mask[y0:y1, x0:x1] = inv[:, :, None]
+        t = self.tile_size
+        self.inked_tiles[y0 // t:(y1 - 1) // t + 1, x0 // t:(x1 - 1) // t + 1] = True
+
+    def clear(self):
+        self.canvas[:] = 0
+        self.inv_mask[:] = 255
+        self.inked_tiles[:] = False
+
+    def _inked_runs(self):
+        """Yield (y0, y1, x0, x1) for each horizontal run of inked tiles"""
+        t = self.tile_size
+        for row, tiles in enumerate(self.inked_tiles):
+            if not tiles.any():
+                continue
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], tiles.view(np.int8), [0]))))
+            for start, end in zip(edges[::2], edges[1::2]):
+                yield row * t, min((row + 1) * t, self.height), start * t, min(end * t, self.width)
+
+    def composite(self, img):
+        """Return img with the canvas blended in; the result lives in a buffer reused next frame"""
+        # Where the canvas is empty the blend reduces to alpha * img
+        cv2.convertScaleAbs(img, dst=self.output, alpha=self.alpha)
+        for y0, y1, x0, x1 in self._inked_runs():
+            scratch = self.scratch[y0:y1, x0:x1]
+            canvas = self.canvas[y0:y1, x0:x1]
+            cv2.bitwise_and(img[y0:y1, x0:x1], self.inv_mask[y0:y1, x0:x1], dst=scratch)
+            cv2.bitwise_or(scratch, canvas, dst=scratch)
+            cv2.addWeighted(scratch, self.alpha, canvas, 1 - self.alpha, 0, dst=self.output[y0:y1, x0:x1])
+        return self.output
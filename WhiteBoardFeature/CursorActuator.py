@@ -0,0 +1,128 @@
+import threading
+import time
+import pyautogui
+
+
+BLINK_THRESHOLD = 0.004  # Lower minus upper eyelid (landmarks 145, 159) in normalized units
+
+
+class BlinkDebouncer:
+    """Turn per-result eye-closed observations into single clicks.
+
+    open -> closing after one closed observation, closing -> closed (fires a click) after
+    closed_frames of them in a row, closed -> open once the eye opens again. Clicks closer
+    than cooldown seconds apart are dropped, which replaces the old one-second sleep.
+    """
+
+    def __init__(self, closed_frames=2, cooldown=1.0):
+        self.closed_frames = closed_frames
+        self.cooldown = cooldown
+        self.state = 'open'
+        self.count = 0
+        self.last_click = 0.0
+
+    def update(self, closed, now=None):
+        """Feed one observation; returns True when it should produce a click"""
+        now = time.time() if now is None else now
+        if not closed:
+            self.state = 'open'
+            self.count = 0
+            return False
+        if self.state == 'closed':
+            return False
+        self.count += 1
+        self.state = 'closing'
+        if self.count < self.closed_frames:
+            return False
+        self.state = 'closed'
+        if now - self.last_click < self.cooldown:
+            return False
+        self.last_click = now
+        return True
+
+
+class CursorActuator:
+    """Move the OS cursor and click from a background thread so the vision loop never blocks.
+
+    move_to() only stores the newest target (older ones are coalesced away); the thread eases
+    the cursor towards it at no more than max_rate moves per second.
+    """
+
+    def __init__(self, max_rate=60, smoothing=0.5, closed_frames=2, cooldown=1.0):
+        self.min_interval = 1.0 / max_rate
+        self.smoothing = smoothing  # Fraction of the remaining distance covered per move
+        self.blinks = BlinkDebouncer(closed_frames, cooldown)
+        self.condition = threading.Condition()
+        self.target = None
+        self.position = None
+        self.pending_clicks = 0
+        self.running = False
+        self.thread = None
+        self.stats = {'targets': 0, 'coalesced': 0, 'moves': 0, 'clicks': 0}
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=1.0)
+
+    def move_to(self, x, y):
+        """Set the cursor target in screen pixels; never blocks"""
+        with self.condition:
+            if self.target is not None and self.target != self.position:
+                self.stats['coalesced'] += 1
+            self.target = (float(x), float(y))
+            self.stats['targets'] += 1
+            self.condition.notify()
+
+    def observe_eye(self, lid_gap):
+        """Feed the eyelid gap of a new face result; queues a click on a debounced blink"""
+        if self.blinks.update(lid_gap < BLINK_THRESHOLD):
+            with self.condition:
+                self.pending_clicks += 1
+                self.condition.notify()
+
+    def _has_work(self):
+        return not self.running or self.pending_clicks or (self.target is not None and self.target != self.position)
+
+    def _loop(self):
+        last_move = 0.0
+        while True:
+            with self.condition:
+                self.condition.wait_for(self._has_work, timeout=0.5)
+                if not self.running:
+                    break
+                target, clicks = self.target, self.pending_clicks
+                self.pending_clicks = 0
+            try:
+                if target is not None and target != self.position:
+                    wait = last_move + self.min_interval - time.time()
+                    if wait > 0:
+                        time.sleep(wait)
+                    self.position = self._step(target)
+                    pyautogui.moveTo(*self.position, _pause=False)
+                    last_move = time.time()
+                    self.stats['moves'] += 1
+                for _ in range(clicks):
+                    pyautogui.click(_pause=False)
+                    self.stats['clicks'] += 1
+            except Exception as e:
+                print(f"Error moving cursor: {e}")
+
+    def _step(self, target):
+        """Next smoothed position; snaps to the target once within a pixel"""
+        if self.position is None:
+            return target
+        x = self.position[0] + (target[0] - self.position[0]) * self.smoothing
+        y = self.position[1] + (target[1] - self.position[1]) * self.smoothing
+        if abs(target[0] - x) < 1 and abs(target[1] - y) < 1:
+            return target
+        return x, y
@@ -1,11 +1,23 @@
 import cv2
 import mediapipe as mp
 import pyautogui
-cam = cv2.VideoCapture(0)
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from CameraBroker import open_camera
+from WhiteBoardFeature.CursorActuator import CursorActuator
+from WhiteBoardFeature.LandmarkFilter import LandmarkFilter
+cam = open_camera(0)
 face_mesh = mp.solutions.face_mesh.FaceMesh(refine_landmarks=True)
 screen_w, screen_h = pyautogui.size()
+# Moves and clicks run on the actuator thread so the camera loop never waits on the OS cursor
+cursor = CursorActuator()
+cursor.start()
+irisFilter = LandmarkFilter(min_cutoff=1.0, beta=5.0)  # Removes iris jitter from the cursor
 while True:
     _, frame = cam.read()
+    frame_time = time.time()
     frame = cv2.flip(frame, 1)
     rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     output = face_mesh.process(rgb_frame)
@@ -18,16 +30,14 @@ while True:
             y = int(landmark.y * frame_h)
             cv2.circle(frame, (x, y), 3, (0, 255, 0))
             if id == 1:
-                screen_x = screen_w * landmark.x
-                screen_y = screen_h * landmark.y
-                pyautogui.moveTo(screen_x, screen_y)
+                irisFilter.update('iris', (landmark.x, landmark.y), frame_time)
+                iris_x, iris_y = irisFilter.position('iris')
+                cursor.move_to(screen_w * iris_x, screen_h * iris_y)
         left = [landmarks[145], landmarks[159]]
         for landmark in left:
             x = int(landmark.x * frame_w)
             y = int(landmark.y * frame_h)
             cv2.circle(frame, (x, y), 3, (0, 255, 255))
-        if (left[0].y - left[1].y) < 0.004:
-            pyautogui.click()
-            pyautogui.sleep(1)
+        cursor.observe_eye(left[0].y - left[1].y)
     cv2.imshow('Eye Controlled Mouse', frame)
     cv2.waitKey(1)
\ No newline at end of file
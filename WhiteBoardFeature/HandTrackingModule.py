@@ -2,6 +2,7 @@ import cv2
 import mediapipe as mp
 import time
 import math
+import numpy as np
 
 class HandDetector:
  def __init__(self, mode=False, maxHands=2, detectionCon=0.5, trackCon=0.5):
@@ -15,55 +16,81 @@ class HandDetector:
                                      min_detection_confidence=float(self.detectionCon), min_tracking_confidence=float(self.trackCon))
      self.mpDraw = mp.solutions.drawing_utils
      self.tipIds = [4, 8, 12, 16, 20]
+     self.tips = np.array(self.tipIds)
+     self.results = None
+     # (nHands, 21, 3) int32 rows of [id, x, y] from the last findPositions call
+     self.landmarks = np.zeros((0, 21, 3), np.int32)
+     self.hand = None
 
  def findHands(self, img, draw=True):
      imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
      self.results = self.hands.process(imgRGB)
+     if draw:
+         self.drawHands(img)
+     return img
 
-     if self.results.multi_hand_landmarks:
+ def drawHands(self, img):
+     # Results may come from findHands or be set by a caller that ran self.hands elsewhere
+     if self.results and self.results.multi_hand_landmarks:
          for handLms in self.results.multi_hand_landmarks:
-             if draw:
-                 self.mpDraw.draw_landmarks(img, handLms, self.mpHands.HAND_CONNECTIONS)
-
+             self.mpDraw.draw_landmarks(img, handLms, self.mpHands.HAND_CONNECTIONS)
      return img
 
+ def findPositions(self, img):
+     """Pixel landmarks of every detected hand as an (nHands, 21, 3) int32 array of [id, x, y]"""
+     h, w = img.shape[:2]
+     if not (self.results and self.results.multi_hand_landmarks):
+         self.landmarks = np.zeros((0, 21, 3), np.int32)
+         self.hand = None
+         return self.landmarks
+     coords = np.array([[(lm.x, lm.y) for lm in hand.landmark] for hand in self.results.multi_hand_landmarks],
+                       np.float32)
+     landmarks = np.empty((len(coords), 21, 3), np.int32)
+     landmarks[:, :, 0] = np.arange(21)
+     landmarks[:, :, 1] = coords[:, :, 0] * w  # Truncates like int() did
+     landmarks[:, :, 2] = coords[:, :, 1] * h
+     self.landmarks = landmarks
+     self.hand = landmarks[0]  # fingersUp and findDistance read the first hand, as findPosition's default
+     return landmarks
+
+ def findBboxes(self, landmarks=None):
+     """(nHands, 4) array of [xmin, ymin, xmax, ymax]"""
+     landmarks = self.landmarks if landmarks is None else landmarks
+     xy = landmarks[..., 1:]
+     return np.concatenate([xy.min(axis=-2), xy.max(axis=-2)], axis=-1)
+
+ def fingersUpAll(self, landmarks=None):
+     """(nHands, 5) array of 0/1 for thumb to little finger"""
+     landmarks = self.landmarks if landmarks is None else landmarks
+     thumb = landmarks[..., self.tips[0], 1] > landmarks[..., self.tips[0] - 1, 1]
+     others = landmarks[..., self.tips[1:], 2] < landmarks[..., self.tips[1:] - 2, 2]
+     return np.concatenate([thumb[..., None], others], axis=-1).astype(np.int32)
+
  def findPosition(self, img, handNo=0, draw=True):
-     xList = []
-     yList = []
-     self.lmList = []
-     if self.results.multi_hand_landmarks:
-         myHand = self.results.multi_hand_landmarks[handNo]
-         for id, lm in enumerate(myHand.landmark):
-             h, w, c = img.shape
-             cx, cy = int(lm.x * w), int(lm.y * h)
-             xList.append(cx)
-             yList.append(cy)
-             self.lmList.append([id, cx, cy])
-             if draw:
-                 cv2.circle(img, (cx, cy), 5, (255, 0, 255), cv2.FILLED)
-         bbox = min(xList), min(yList), max(xList), max(yList)
-         if draw:
-             cv2.rectangle(img, (bbox[0] - 20, bbox[1] - 20), (bbox[2] + 20, bbox[3] + 20), (0, 255, 0), 2)
-         return self.lmList, bbox
-     return [], []  # Add this return statement to avoid returning None
+     # List view over findPositions, kept for existing callers
+     landmarks = self.findPositions(img)
+     if handNo >= len(landmarks):
+         self.lmList = []
+         self.hand = None  # So fingersUp never reports a hand from an earlier frame
+         return [], []  # Add this return statement to avoid returning None
+     self.hand = landmarks[handNo]
+     self.lmList = self.hand.tolist()
+     bbox = tuple(self.findBboxes(self.hand).tolist())
+     if draw:
+         for _, cx, cy in self.lmList:
+             cv2.circle(img, (cx, cy), 5, (255, 0, 255), cv2.FILLED)
+         cv2.rectangle(img, (bbox[0] - 20, bbox[1] - 20), (bbox[2] + 20, bbox[3] + 20), (0, 255, 0), 2)
+     return self.lmList, bbox
 
  def fingersUp(self):
-     fingers = []
-     if self.lmList[self.tipIds[0]][1] > self.lmList[self.tipIds[0] - 1][1]:
-         fingers.append(1)
-     else:
-         fingers.append(0)
-
-     for id in range(1, 5):
-         if self.lmList[self.tipIds[id]][2] < self.lmList[self.tipIds[id] - 2][2]:
-             fingers.append(1)
-         else:
-             fingers.append(0)
-     return fingers
+     # Empty when the last findPosition found no hand
+     if self.hand is None:
+         return []
+     return self.fingersUpAll(self.hand).tolist()
 
  def findDistance(self, p1, p2, img, draw=True, r=15, t=3):
-     x1, y1 = self.lmList[p1][1:]
-     x2, y2 = self.lmList[p2][1:]
+     x1, y1 = self.hand[p1, 1:].tolist()
+     x2, y2 = self.hand[p2, 1:].tolist()
      cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
      if draw:
          cv2.line(img, (x1, y1), (x2, y2), (255, 0, 255), t)
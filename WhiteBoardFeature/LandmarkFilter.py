@@ -0,0 +1,100 @@
+import math
+import time
+
+
+def _alpha(cutoff, dt):
+    """Smoothing factor of a first-order low-pass filter with the given cutoff (Hz)"""
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """One Euro filter (Casiez et al., 2012) for a 2D point, with linear prediction.
+
+    Slow movement is smoothed hard (cutoff near min_cutoff) to remove jitter; the cutoff rises
+    with speed (beta) so fast strokes do not lag. The smoothed velocity extrapolates the point
+    past its last sample to cover the time the model took to produce it.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.x = None
+        self.dx = (0.0, 0.0)
+        self.t = None
+
+    def update(self, point, t):
+        """Add a measurement taken at time t and return the filtered point"""
+        px, py = float(point[0]), float(point[1])
+        if self.x is None:
+            self.x, self.t = (px, py), t
+            return self.x
+        dt = t - self.t
+        if dt <= 0:
+            return self.x
+        a_d = _alpha(self.d_cutoff, dt)
+        vx, vy = (px - self.x[0]) / dt, (py - self.x[1]) / dt
+        self.dx = (self.dx[0] + a_d * (vx - self.dx[0]), self.dx[1] + a_d * (vy - self.dx[1]))
+        a = _alpha(self.min_cutoff + self.beta * math.hypot(*self.dx), dt)
+        self.x = (self.x[0] + a * (px - self.x[0]), self.x[1] + a * (py - self.x[1]))
+        self.t = t
+        return self.x
+
+    def predict(self, t, max_horizon):
+        """Filtered point extrapolated to time t, at most max_horizon seconds ahead"""
+        if self.x is None:
+            return None
+        h = min(max(t - self.t, 0.0), max_horizon)
+        return self.x[0] + self.dx[0] * h, self.x[1] + self.dx[1] * h
+
+
+class LandmarkFilter:
+    """One Euro filters for a set of named landmarks, updated on new model results and read every frame.
+
+    beta is in units of the coordinates: pick it for pixels or for normalized landmarks.
+    Time spent filtering is accumulated per rendered frame (end_frame) for stats().
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0, max_horizon=0.1):
+        self.params = (min_cutoff, beta, d_cutoff)
+        self.max_horizon = max_horizon
+        self.filters = {}
+        self.frames = 0
+        self.seconds = 0.0
+        self.frame_seconds = 0.0
+        self.last_frame_seconds = 0.0
+
+    def update(self, name, point, t):
+        """Feed a landmark from a new model result; t is when its frame was captured"""
+        start = time.perf_counter()
+        if name not in self.filters:
+            self.filters[name] = OneEuroFilter(*self.params)
+        self.filters[name].update(point, t)
+        self.frame_seconds += time.perf_counter() - start
+
+    def position(self, name, t=None):
+        """Smoothed, latency-compensated position at time t (default now), or None if never seen"""
+        start = time.perf_counter()
+        f = self.filters.get(name)
+        point = f.predict(time.time() if t is None else t, self.max_horizon) if f else None
+        self.frame_seconds += time.perf_counter() - start
+        return point
+
+    def reset(self, name=None):
+        """Forget a landmark (or all of them), e.g. when the hand leaves the frame"""
+        if name is None:
+            self.filters.clear()
+        else:
+            self.filters.pop(name, None)
+
+    def end_frame(self):
+        self.seconds += self.frame_seconds
+        self.last_frame_seconds = self.frame_seconds
+        self.frame_seconds = 0.0
+        self.frames += 1
+
+    def stats(self):
+        """Average and last per-frame filter cost in microseconds"""
+        return {'frames': self.frames, 'avg_us': self.seconds * 1e6 / max(self.frames, 1),
+                'last_us': self.last_frame_seconds * 1e6}
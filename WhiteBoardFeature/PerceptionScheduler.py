@@ -0,0 +1,142 @@
+import threading
+import time
+import cv2
+
+
+class FramePreprocessor:
+    """Convert a BGR camera frame to RGB once, at the inference size, for every perception model.
+
+    Frames wider than inference_width are downscaled with their aspect ratio kept. MediaPipe
+    returns normalized landmarks, so results map back to display pixels by scaling with the
+    display frame's size. Each call returns a new buffer, since workers may still hold older ones.
+    """
+
+    def __init__(self, inference_width=640):
+        self.inference_width = inference_width
+        self.frames = 0
+        self.seconds = 0.0
+
+    def __call__(self, img):
+        start = time.perf_counter()
+        h, w = img.shape[:2]
+        if self.inference_width and w > self.inference_width:
+            size = (self.inference_width, round(h * self.inference_width / w))
+            rgb = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(rgb, cv2.COLOR_BGR2RGB, dst=rgb)  # In place on the small buffer
+        else:
+            rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        self.seconds += time.perf_counter() - start
+        self.frames += 1
+        return rgb
+
+    def stats(self):
+        return {'frames': self.frames, 'avg_ms': self.seconds * 1000 / max(self.frames, 1)}
+
+
+class ModelWorker:
+    """Runs one model on the freshest submitted frame, at most target_rate times per second"""
+
+    def __init__(self, name, process, target_rate=None):
+        self.name = name
+        self.process = process
+        self.min_interval = 1.0 / target_rate if target_rate else 0.0
+        self.condition = threading.Condition()
+        self.frame = None
+        self.frame_seq = 0
+        self.frame_time = 0.0
+        self.taken_seq = 0
+        # (result, frame seq, finished at, frame submitted at) swapped as one tuple so readers
+        # never see a mix
+        self.latest = (None, 0, 0.0, 0.0)
+        self.runs = 0
+        self.busy_seconds = 0.0
+        self.thread = None
+
+    def submit(self, frame, seq, frame_time):
+        """Replace any frame the worker has not started on yet"""
+        with self.condition:
+            self.frame = frame
+            self.frame_seq = seq
+            self.frame_time = frame_time
+            self.condition.notify()
+
+    def run_once(self, frame, seq, frame_time):
+        start = time.perf_counter()
+        result = self.process(frame)
+        self.busy_seconds += time.perf_counter() - start
+        self.runs += 1
+        self.latest = (result, seq, time.time(), frame_time)
+
+    def loop(self, scheduler):
+        """Worker thread: wait for a new frame, honour the rate cap, run the model"""
+        last_run = 0.0
+        while scheduler.running:
+            wait = last_run + self.min_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            with self.condition:
+                if not self.condition.wait_for(lambda: self.frame_seq > self.taken_seq or not scheduler.running,
+                                               timeout=0.5):
+                    continue
+                if not scheduler.running:
+                    break
+                frame, seq, frame_time = self.frame, self.frame_seq, self.frame_time
+                self.taken_seq = seq
+            last_run = time.time()
+            try:
+                self.run_once(frame, seq, frame_time)
+            except Exception as e:
+                print(f"Error in {self.name} model: {e}")
+
+
+class PerceptionScheduler:
+    """Run several perception models off the render loop, in parallel workers or on staggered frames.
+
+    mode='parallel' gives each model a worker thread (MediaPipe releases the GIL while a graph
+    runs), capped at target_rates[name] runs per second. mode='staggered' runs the models in the
+    calling thread, model name on every cadence[name]-th frame with offsets so they alternate.
+    """
+
+    def __init__(self, models, mode='parallel', target_rates=None, cadence=None):
+        target_rates = target_rates or {}
+        self.mode = mode
+        self.workers = {name: ModelWorker(name, process, target_rates.get(name))
+                        for name, process in models.items()}
+        self.cadence = cadence or {name: len(models) for name in models}
+        self.offsets = {name: i for i, name in enumerate(models)}
+        self.seq = 0
+        self.running = False
+
+    def start(self):
+        self.running = True
+        if self.mode == 'parallel':
+            for worker in self.workers.values():
+                worker.thread = threading.Thread(target=worker.loop, args=(self,), daemon=True)
+                worker.thread.start()
+
+    def stop(self):
+        self.running = False
+        for worker in self.workers.values():
+            with worker.condition:
+                worker.condition.notify_all()
+            if worker.thread and worker.thread.is_alive():
+                worker.thread.join(timeout=1.0)
+
+    def submit(self, frame):
+        """Hand a new frame to the models; never blocks in parallel mode. The frame must not be modified later."""
+        self.seq += 1
+        now = time.time()
+        for name, worker in self.workers.items():
+            if self.mode == 'parallel':
+                worker.submit(frame, self.seq, now)
+            elif self.seq % self.cadence[name] == self.offsets[name] % self.cadence[name]:
+                worker.run_once(frame, self.seq, now)
+
+    def latest(self, name):
+        """Latest (result, frame seq, finished at, frame submitted at) for a model; result is None until its first run"""
+        return self.workers[name].latest
+
+    def stats(self):
+        """Runs and average model time per worker"""
+        return {name: {'runs': w.runs, 'avg_ms': w.busy_seconds * 1000 / max(w.runs, 1)}
+                for name, w in self.workers.items()}
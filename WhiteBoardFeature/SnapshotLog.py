@@ -0,0 +1,131 @@
+import os
+import struct
+import time
+import zlib
+import numpy as np
+
+
+# File header: magic, width, height, tile size. Each record: magic, timestamp, tile count,
+# then per tile its row, column and zlib-compressed length followed by the pixels.
+FILE_HEADER = struct.Struct('<6sHHH')
+RECORD_HEADER = struct.Struct('<4sdI')
+TILE_HEADER = struct.Struct('<HHI')
+FILE_MAGIC = b'WBLOG1'
+RECORD_MAGIC = b'WBSN'
+INK_THRESHOLD = 50  # A pixel counts as ink when any channel is brighter than this
+
+
+class SnapshotLog:
+    """Append-only log of canvas snapshots that stores only the tiles changed since the last one.
+
+    write() is cheap: one vectorized diff against the last written canvas, then zlib level 1 on
+    the changed tiles. A run starts a fresh log; its first record holds every inked tile.
+    """
+
+    def __init__(self, path, width=1280, height=720, tile_size=80, interval=2.0):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.interval = interval
+        self.last = np.zeros((height, width, 3), np.uint8)
+        self.last_write = 0.0
+        self.row_starts = np.arange(0, height, tile_size)
+        self.col_starts = np.arange(0, width, tile_size)
+        self.records = 0
+        self.bytes_written = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'wb')
+        self.file.write(FILE_HEADER.pack(FILE_MAGIC, width, height, tile_size))
+        self.file.flush()
+
+    def changed_tiles(self, canvas):
+        """(row, col) of every tile that differs from the last written canvas"""
+        changed = (canvas != self.last).any(axis=2)
+        tiles = np.logical_or.reduceat(np.logical_or.reduceat(changed, self.row_starts, axis=0),
+                                       self.col_starts, axis=1)
+        return np.argwhere(tiles)
+
+    def maybe_write(self, canvas, now=None):
+        """Write a snapshot if interval seconds have passed since the last one"""
+        now = time.time() if now is None else now
+        if now - self.last_write >= self.interval:
+            self.write(canvas, now)
+
+    def write(self, canvas, now=None):
+        """Append the tiles that changed since the last snapshot; returns how many were written"""
+        now = time.time() if now is None else now
+        self.last_write = now
+        tiles = self.changed_tiles(canvas)
+        if not len(tiles):
+            return 0
+        t = self.tile_size
+        chunks = [RECORD_HEADER.pack(RECORD_MAGIC, now, len(tiles))]
+        for row, col in tiles.tolist():
+            tile = canvas[row * t:(row + 1) * t, col * t:(col + 1) * t]
+            data = zlib.compress(np.ascontiguousarray(tile).data, 1)
+            chunks.append(TILE_HEADER.pack(row, col, len(data)))
+            chunks.append(data)
+            self.last[row * t:(row + 1) * t, col * t:(col + 1) * t] = tile
+        record = b''.join(chunks)
+        self.file.write(record)
+        self.file.flush()
+        self.records += 1
+        self.bytes_written += len(record)
+        return len(tiles)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def load_canvas(path):
+    """Rebuild the latest canvas from a snapshot log; returns (canvas, timestamp) or (None, None).
+
+    A record cut short (the whiteboard process was killed mid-write) is ignored.
+    """
+    if not os.path.exists(path):
+        return None, None
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < FILE_HEADER.size:
+        return None, None
+    magic, width, height, t = FILE_HEADER.unpack_from(data)
+    if magic != FILE_MAGIC:
+        return None, None
+    canvas = np.zeros((height, width, 3), np.uint8)
+    timestamp = None
+    offset = FILE_HEADER.size
+    while offset + RECORD_HEADER.size <= len(data):
+        magic, record_time, count = RECORD_HEADER.unpack_from(data, offset)
+        if magic != RECORD_MAGIC:
+            break
+        pos = offset + RECORD_HEADER.size
+        tiles = []
+        for _ in range(count):
+            if pos + TILE_HEADER.size > len(data):
+                break
+            row, col, size = TILE_HEADER.unpack_from(data, pos)
+            pos += TILE_HEADER.size
+            if pos + size > len(data):
+                break
+            tiles.append((row, col, data[pos:pos + size]))
+            pos += size
+        if len(tiles) < count:
+            break  # Truncated record
+        for row, col, payload in tiles:
+            target = canvas[row * t:(row + 1) * t, col * t:(col + 1) * t]
+            target[:] = np.frombuffer(zlib.decompress(payload), np.uint8).reshape(target.shape)
+        timestamp = record_time
+        offset = pos
+    return canvas, timestamp
+
+
+def crop_to_ink(canvas, margin=20):
+    """Crop the canvas to the bounding box of its ink plus a margin; None if it is blank"""
+    ys, xs = np.nonzero(canvas.max(axis=2) > INK_THRESHOLD)
+    if not len(xs):
+        return None
+    h, w = canvas.shape[:2]
+    return canvas[max(ys.min() - margin, 0):min(ys.max() + margin + 1, h),
+                  max(xs.min() - margin, 0):min(xs.max() + margin + 1, w)]
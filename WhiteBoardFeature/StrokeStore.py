@@ -0,0 +1,216 @@
+import gzip
+import json
+import os
+import time
+import cv2
+import numpy as np
+
+
+class Stroke:
+    """One pen-down to pen-up stroke: points in canvas pixels plus millisecond offsets"""
+
+    def __init__(self, color, thickness, start_time):
+        self.color = tuple(int(c) for c in color)
+        self.thickness = int(thickness)
+        self.start_time = start_time  # Seconds since the session started
+        self._points = []
+        self._times = []
+        self.points = np.zeros((0, 2), np.int16)
+        self.times = np.zeros(0, np.int32)
+
+    def add_point(self, point, t):
+        self._points.append(point)
+        self._times.append(int((t - self.start_time) * 1000))
+
+    def finish(self):
+        """Pack the collected points into compact arrays"""
+        if self._points:
+            self.points = np.array(self._points, np.int16).reshape(-1, 2)
+            self.times = np.array(self._times, np.int32)
+            self._points, self._times = [], []
+        return self
+
+    def segments(self):
+        """Consecutive point pairs; a single point gives a dot"""
+        points = [tuple(p) for p in self.points.tolist()]
+        if len(points) == 1:
+            return [(points[0], points[0])]
+        return list(zip(points, points[1:]))
+
+    def to_dict(self):
+        return {'type': 'stroke', 'color': list(self.color), 'thickness': self.thickness,
+                't': round(self.start_time, 3), 'points': self.points.ravel().tolist(), 'dt': self.times.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        stroke = cls(data['color'], data['thickness'], data['t'])
+        stroke.points = np.array(data['points'], np.int16).reshape(-1, 2)
+        stroke.times = np.array(data['dt'], np.int32)
+        return stroke
+
+
+class ClearEvent:
+    """The whole canvas was wiped; kept in the history so it can be undone"""
+
+    def __init__(self, start_time):
+        self.start_time = start_time
+
+    def to_dict(self):
+        return {'type': 'clear', 't': round(self.start_time, 3)}
+
+
+class StrokeStore:
+    """Vector history of the whiteboard that rasterizes into a CanvasCompositor as strokes arrive"""
+
+    def __init__(self, compositor):
+        self.compositor = compositor
+        self.events = []
+        self.redo_stack = []
+        self.current = None
+        self.session_start = time.time()
+
+    def now(self):
+        return time.time() - self.session_start
+
+    # Recording
+
+    def add_point(self, point, color, thickness):
+        """Extend the current stroke, starting one if needed, and draw only the new segment"""
+        t = self.now()
+        if self.current is None or self.current.color != tuple(color) or self.current.thickness != thickness:
+            self.end_stroke()
+            self.current = Stroke(color, thickness, t)
+            previous = point
+        else:
+            previous = self.current._points[-1]
+        self.current.add_point(point, t)
+        self.compositor.draw_line(previous, point, self.current.color, self.current.thickness)
+
+    def end_stroke(self):
+        """Pen up: commit the current stroke to the history"""
+        if self.current is not None:
+            self.events.append(self.current.finish())
+            self.redo_stack.clear()
+            self.current = None
+
+    def clear(self):
+        """Wipe the canvas; returns False if it was already empty, so a held gesture records one clear"""
+        self.end_stroke()
+        if not self.events or isinstance(self.events[-1], ClearEvent):
+            return False
+        self.events.append(ClearEvent(self.now()))
+        self.redo_stack.clear()
+        self.compositor.clear()
+        return True
+
+    # History
+
+    def _rasterize(self, event):
+        if isinstance(event, ClearEvent):
+            self.compositor.clear()
+            return
+        for p1, p2 in event.segments():
+            self.compositor.draw_line(p1, p2, event.color, event.thickness)
+
+    def rebuild(self):
+        """Redraw the canvas from the events after the last clear"""
+        self.compositor.clear()
+        start = 0
+        for i, event in enumerate(self.events):
+            if isinstance(event, ClearEvent):
+                start = i + 1
+        for event in self.events[start:]:
+            self._rasterize(event)
+
+    def undo(self):
+        self.end_stroke()
+        if self.events:
+            self.redo_stack.append(self.events.pop())
+            self.rebuild()
+
+    def redo(self):
+        self.end_stroke()
+        if self.redo_stack:
+            event = self.redo_stack.pop()
+            self.events.append(event)
+            self._rasterize(event)
+
+    def replay(self, speed=4.0, fps=30, max_gap=0.5):
+        """Yield canvas images of a time-lapse of the session, speed times faster than real time.
+
+        Pauses longer than max_gap session seconds are shortened to max_gap, so idle time does not
+        replay as long stretches of an unchanged canvas.
+        """
+        canvas = np.zeros_like(self.compositor.canvas)
+        frame_step = speed / fps  # Session seconds per yielded frame
+        next_frame = 0.0
+        skipped = 0.0  # Idle session time cut out so far
+        last_t = None
+        for event in self.events:
+            if isinstance(event, ClearEvent):
+                canvas[:] = 0
+                continue
+            for (p1, p2), dt in zip(event.segments(), event.times[1:].tolist() or [0]):
+                t = event.start_time + dt / 1000
+                gap = t - skipped - (last_t if last_t is not None else 0.0)
+                if gap > max_gap:
+                    skipped += gap - max_gap
+                t -= skipped
+                last_t = t
+                while t > next_frame:
+                    yield canvas
+                    next_frame += frame_step
+                cv2.line(canvas, p1, p2, event.color, event.thickness)
+        yield canvas
+
+    # Persistence and export
+
+    def to_dict(self):
+        return {'version': 1, 'width': self.compositor.width, 'height': self.compositor.height,
+                'events': [event.to_dict() for event in self.events]}
+
+    def save(self, path):
+        """Write the session as gzipped JSON"""
+        self.end_stroke()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with gzip.open(path, 'wt') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+
+    def load(self, path):
+        """Resume a saved session and redraw its canvas"""
+        with gzip.open(path, 'rt') as f:
+            data = json.load(f)
+        self.events = [Stroke.from_dict(e) if e['type'] == 'stroke' else ClearEvent(e['t'])
+                       for e in data['events']]
+        self.redo_stack.clear()
+        self.current = None
+        # New strokes continue the session timeline after the loaded ones
+        last = self.events[-1].start_time if self.events else 0.0
+        self.session_start = time.time() - last
+        self.rebuild()
+
+    def export_json(self, path):
+        self.end_stroke()
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+
+    def export_svg(self, path):
+        """Write the visible strokes as SVG polylines on the canvas's black background"""
+        self.end_stroke()
+        start = 0
+        for i, event in enumerate(self.events):
+            if isinstance(event, ClearEvent):
+                start = i + 1
+        w, h = self.compositor.width, self.compositor.height
+        lines = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" viewBox="0 0 {w} {h}">',
+                 f'<rect width="{w}" height="{h}" fill="black"/>']
+        for event in self.events[start:]:
+            b, g, r = event.color
+            points = ' '.join(f'{x},{y}' for x, y in event.points.tolist())
+            if len(event.points) == 1:
+                points += ' ' + points
+            lines.append(f'<polyline points="{points}" fill="none" stroke="#{r:02x}{g:02x}{b:02x}" '
+                         f'stroke-width="{event.thickness}" stroke-linecap="round" stroke-linejoin="round"/>')
+        lines.append('</svg>')
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines))
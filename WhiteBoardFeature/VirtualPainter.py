@@ -1,12 +1,94 @@
 import cv2
 import mediapipe as mp
-import pyautogui
-import numpy as np
+import glob
 import os
+import signal
+import sys
+import threading
+import time
 from WhiteBoardFeature import HandTrackingModule as htm
+from WhiteBoardFeature.Compositor import CanvasCompositor
+from WhiteBoardFeature.PerceptionScheduler import FramePreprocessor, PerceptionScheduler
+from WhiteBoardFeature.StrokeStore import StrokeStore
+from WhiteBoardFeature.LandmarkFilter import LandmarkFilter
+from WhiteBoardFeature.SnapshotLog import SnapshotLog
+from CameraBroker import open_camera
 
 
-def VirtualPainter():
+STAGES = ('capture', 'preprocess', 'eyes', 'hands', 'gestures', 'composite', 'display')
+
+
+class ImageSequence:
+    """cv2.VideoCapture-style reader over image files matching a glob pattern, in name order"""
+
+    def __init__(self, pattern):
+        self.paths = sorted(glob.glob(pattern))
+        self.index = 0
+
+    def isOpened(self):
+        return self.index < len(self.paths)
+
+    def set(self, prop, value):
+        return False
+
+    def read(self):
+        while self.index < len(self.paths):
+            img = cv2.imread(self.paths[self.index])
+            self.index += 1
+            if img is not None:
+                return True, img
+        return False, None
+
+    def release(self):
+        self.index = len(self.paths)
+
+
+def open_source(source):
+    """Camera when source is None, otherwise a video file, an image directory or a glob pattern"""
+    if source is None:
+        return open_camera(0)  # Shares the camera broker's stream when one is running
+    if os.path.isdir(source):
+        return ImageSequence(os.path.join(source, '*'))
+    if any(c in source for c in '*?['):
+        return ImageSequence(source)
+    return cv2.VideoCapture(source)
+
+
+class StageTimer:
+    """Wall time per loop stage; mark(stage) charges the time since the previous mark to stage"""
+
+    def __init__(self, stages=STAGES):
+        self.seconds = dict.fromkeys(stages, 0.0)
+        self.last = time.perf_counter()
+
+    def start(self):
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.seconds[stage] += now - self.last
+        self.last = now
+
+    def report(self, frames):
+        """Average milliseconds per frame for each stage"""
+        return {stage: seconds * 1000 / max(frames, 1) for stage, seconds in self.seconds.items()}
+
+
+def VirtualPainter(perceptionMode="parallel", targetRates=None, cadence=None,
+                   sessionPath="whiteboard_sessions/session.json.gz", inferenceWidth=640,
+                   source=None, headless=False, maxFrames=None,
+                   snapshotPath="whiteboard_sessions/canvas_log.bin"):
+    """Run the whiteboard. perceptionMode 'parallel' runs face mesh and hand tracking in worker
+    threads, 'staggered' alternates them on the render thread (see PerceptionScheduler).
+    The models see an RGB copy downscaled to inferenceWidth; drawing stays at full resolution.
+
+    Keys: z undo, y redo, r time-lapse replay, s save the session, e export SVG and JSON.
+    The session is resumed from sessionPath if it exists and saved there on exit.
+
+    source reads a video file or image sequence instead of the camera and stops at its end.
+    headless skips the windows and the OS cursor. Returns frame count, FPS and per-stage timings.
+    Every few seconds the changed canvas tiles are appended to snapshotPath, so the assistant can
+    read the board while it is open and after the process is killed."""
 
 
 #######################
@@ -25,31 +107,81 @@ def VirtualPainter():
     header = overlayList[0]
     drawColor = (255, 0, 255)
 
-    cap = cv2.VideoCapture(0)
+    cap = open_source(source)
     cap.set(3, 1280)
     cap.set(4, 720)
 
     detector = htm.HandDetector(detectionCon=0.65, maxHands=1)
     xp, yp = 0, 0
-    imgCanvas = np.zeros((720, 1280, 3), np.uint8)
+    # Keeps the canvas plus an incrementally updated ink mask for cheap blending
+    compositor = CanvasCompositor(1280, 720)
+    # Strokes are recorded as vectors and rasterized into the compositor as they are drawn
+    strokes = StrokeStore(compositor)
+    if sessionPath and os.path.exists(sessionPath):
+        strokes.load(sessionPath)
+        print(f"Resumed whiteboard session from {sessionPath}")
+    snapshots = SnapshotLog(snapshotPath, 1280, 720) if snapshotPath else None
 
     face_mesh = mp.solutions.face_mesh.FaceMesh(refine_landmarks=True)
-    screen_w, screen_h = pyautogui.size()
 
+    # Both models run off the render loop, which only picks up their latest results
+    perception = PerceptionScheduler({'face': face_mesh.process, 'hands': detector.hands.process},
+                                     mode=perceptionMode, target_rates=targetRates, cadence=cadence)
+    perception.start()
+    preprocess = FramePreprocessor(inferenceWidth)
+    lastFaceSeq = 0
+    lastHandsSeq = 0
+    # Smooth the fingertips (pixels) and iris (normalized) and predict them forward to the
+    # current frame, so the models can run below display rate without strokes lagging
+    tipFilter = LandmarkFilter(min_cutoff=1.0, beta=0.01)
+    irisFilter = LandmarkFilter(min_cutoff=1.0, beta=5.0)
+    if headless:
+        cursor = None
+    else:
+        # Imported here so headless runs work without a display
+        import pyautogui
+        from WhiteBoardFeature.CursorActuator import CursorActuator
+        screen_w, screen_h = pyautogui.size()
+        # Cursor moves and blink clicks happen on their own thread
+        cursor = CursorActuator()
+        cursor.start()
+
+    # app.py stops the whiteboard with terminate(); turn SIGTERM into SystemExit so the
+    # finally below still saves the session
+    previousSigterm = None
+    if threading.current_thread() is threading.main_thread():
+        previousSigterm = signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    timer = StageTimer()
+    frames = 0
+    started = time.perf_counter()
     try:
-        while True:
+        while maxFrames is None or frames < maxFrames:
+            timer.start()
             # 1. Import image
             success, img = cap.read()
             if not success:
+                if source is not None:
+                    break  # End of the recording
                 print("Ignoring empty camera frame")
                 continue  # Skip to the next iteration if frame is empty
+            if img.shape[:2] != (720, 1280):
+                img = cv2.resize(img, (1280, 720))
 
             img = cv2.flip(img, 1)
+            timer.mark('capture')
+            # One small RGB copy shared by both models and never drawn on; their normalized
+            # landmarks are scaled by the full-size frame below
+            perception.submit(preprocess(img))
+            timer.mark('preprocess')
+
+            now = time.time()
 
             # Eye Tracking
-            rgb_frame = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            output = face_mesh.process(rgb_frame)
-            landmark_points = output.multi_face_landmarks
+            output, faceSeq, _, faceFrameTime = perception.latest('face')
+            newFaceResult = faceSeq != lastFaceSeq
+            lastFaceSeq = faceSeq
+            landmark_points = output.multi_face_landmarks if output else None
             frame_h, frame_w, _ = img.shape
             if landmark_points:
                 landmarks = landmark_points[0].landmark
@@ -57,30 +189,43 @@ def VirtualPainter():
                     x = int(landmark.x * frame_w)
                     y = int(landmark.y * frame_h)
                     cv2.circle(img, (x, y), 3, (0, 255, 0))
-                    if id == 1:
-                        screen_x = screen_w * landmark.x
-                        screen_y = screen_h * landmark.y
-                        pyautogui.moveTo(screen_x, screen_y)
+                    if id == 1 and newFaceResult:
+                        irisFilter.update('iris', (landmark.x, landmark.y), faceFrameTime)
                 left = [landmarks[145], landmarks[159]]
                 for landmark in left:
                     x = int(landmark.x * frame_w)
                     y = int(landmark.y * frame_h)
                     cv2.circle(img, (x, y), 3, (0, 255, 255))
-                if (left[0].y - left[1].y) < 0.004:
-                    pyautogui.click()
-                    pyautogui.sleep(1)
+                # A blink is observed once per face result, not on every frame that reuses it
+                if newFaceResult and cursor:
+                    cursor.observe_eye(left[0].y - left[1].y)
+                iris = irisFilter.position('iris', now)
+                if iris and cursor:
+                    cursor.move_to(screen_w * iris[0], screen_h * iris[1])
+            else:
+                irisFilter.reset()
+            timer.mark('eyes')
 
             # 2. Find Hand Landmarks
-            img = detector.findHands(img)
-            lmList, _ = detector.findPosition(img, draw=False)  # Added _ to ignore bbox
+            handsResult, handsSeq, _, handsFrameTime = perception.latest('hands')
+            detector.results = handsResult
+            img = detector.drawHands(img)
+            hands = detector.findPositions(img)  # (nHands, 21, 3) array of [id, x, y]
+            if not len(hands):
+                tipFilter.reset()
+            elif handsSeq != lastHandsSeq:
+                tipFilter.update('index', hands[0, 8, 1:], handsFrameTime)
+                tipFilter.update('middle', hands[0, 12, 1:], handsFrameTime)
+            lastHandsSeq = handsSeq
+            timer.mark('hands')
 
-            if len(lmList) >= 9:
-                # tip of index and middle fingers
-                x1, y1 = lmList[8][1:]
-                x2, y2 = lmList[12][1:]
+            if len(hands):
+                # tip of index and middle fingers, filtered and predicted to this frame
+                x1, y1 = (round(v) for v in tipFilter.position('index', now))
+                x2, y2 = (round(v) for v in tipFilter.position('middle', now))
 
                 # 3. Check which fingers are up
-                fingers = detector.fingersUp()
+                fingers = detector.fingersUpAll(hands)[0].tolist()
 
                 # 4. If Selection Mode - Two finger are up
                 if fingers[1] and fingers[2]:
@@ -107,38 +252,81 @@ def VirtualPainter():
                     if xp == 0 and yp == 0:
                         xp, yp = x1, y1
 
-                    if drawColor == (0, 0, 0):  # Eraser logic
-                        cv2.line(img, (xp, yp), (x1, y1), drawColor, eraserThickness)
-                        cv2.line(imgCanvas, (xp, yp), (x1, y1), drawColor, eraserThickness)
-                    else:
-                        cv2.line(img, (xp, yp), (x1, y1), drawColor, brushThickness)
-                        cv2.line(imgCanvas, (xp, yp), (x1, y1), drawColor, brushThickness)
+                    thickness = eraserThickness if drawColor == (0, 0, 0) else brushThickness  # Eraser logic
+                    cv2.line(img, (xp, yp), (x1, y1), drawColor, thickness)
+                    strokes.add_point((x1, y1), drawColor, thickness)
 
                     xp, yp = x1, y1
+                else:
+                    # Pen up: the next drawing gesture starts a new stroke
+                    strokes.end_stroke()
+                    xp, yp = 0, 0
 
-                # Clear Canvas when all fingers are up
-                if all(x >= 1 for x in fingers):
-                    imgCanvas = np.zeros((720, 1280, 3), np.uint8)
+                # Clear Canvas when all fingers are up (undo brings it back)
+                if all(x >= 1 for x in fingers) and strokes.clear():
                     print("Canvas Cleared")  # Add a print statement for debugging
+            else:
+                strokes.end_stroke()
+                xp, yp = 0, 0
+            timer.mark('gestures')
 
-            imgGray = cv2.cvtColor(imgCanvas, cv2.COLOR_BGR2GRAY)
-            _, imgInv = cv2.threshold(imgGray, 50, 255, cv2.THRESH_BINARY_INV)
-            imgInv = cv2.cvtColor(imgInv, cv2.COLOR_GRAY2BGR)
-            img = cv2.bitwise_and(img, imgInv)
-            img = cv2.bitwise_or(img, imgCanvas)
-
-            img = cv2.addWeighted(img, 0.7, imgCanvas, 0.3, 0)  # Correct Blending
+            # Same blend as before (ink replaces the frame, 0.7/0.3 weighting) but only inked tiles
+            # get the per-pixel mask work
+            img = compositor.composite(img)
+            tipFilter.end_frame()
+            irisFilter.end_frame()
 
             # Setting the header image
             img[0:125, 0:1280] = header
+            if snapshots:
+                snapshots.maybe_write(compositor.canvas)
+            timer.mark('composite')
+            frames += 1
 
+            if headless:
+                continue
             cv2.imshow("Image", img)
-            cv2.imshow("Canvas", imgCanvas)  # Keep the canvas window for debugging
-            # cv2.imshow("Inv", imgInv) # You can comment out this line to remove the inv window
-            cv2.waitKey(1)
+            cv2.imshow("Canvas", compositor.canvas)  # Keep the canvas window for debugging
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('z'):
+                strokes.undo()
+            elif key == ord('y'):
+                strokes.redo()
+            elif key == ord('s') and sessionPath:
+                strokes.save(sessionPath)
+                print(f"Whiteboard session saved to {sessionPath}")
+            elif key == ord('e'):
+                strokes.export_svg("whiteboard.svg")
+                strokes.export_json("whiteboard.json")
+                print("Whiteboard exported to whiteboard.svg and whiteboard.json")
+            elif key == ord('r'):
+                for frame in strokes.replay():
+                    cv2.imshow("Replay", frame)
+                    cv2.waitKey(33)
+            timer.mark('display')
 
     except KeyboardInterrupt:
         print("Program terminated.")
     finally:
+        if sessionPath:
+            strokes.save(sessionPath)
+        if snapshots:
+            snapshots.write(compositor.canvas)
+            snapshots.close()
+        perception.stop()
+        if cursor:
+            cursor.stop()
+        print(f"Perception: {perception.stats()}, preprocessing: {preprocess.stats()}")
+        print(f"Landmark filter cost per frame: fingertips {tipFilter.stats()['avg_us']:.1f} us, "
+              f"iris {irisFilter.stats()['avg_us']:.1f} us")
         cap.release()
-        cv2.destroyAllWindows()
\ No newline at end of file
+        if not headless:
+            cv2.destroyAllWindows()
+        if previousSigterm is not None:
+            signal.signal(signal.SIGTERM, previousSigterm)
+
+    elapsed = time.perf_counter() - started
+    return {'frames': frames, 'seconds': elapsed, 'fps': frames / elapsed if elapsed > 0 else 0.0,
+            'stages_ms': timer.report(frames), 'perception': perception.stats(),
+            'preprocess': preprocess.stats(),
+            'filters_us': {'fingertips': tipFilter.stats()['avg_us'], 'iris': irisFilter.stats()['avg_us']}}
\ No newline at end of file
@@ -0,0 +1,36 @@
+import signal
+import sys
+import threading
+
+
+_start_lock = threading.Lock()
+
+
+def _exit_on_sigterm(signum, frame):
+    """terminate() then unwinds the worker like sys.exit, so its finally blocks still run"""
+    sys.exit(128 + signum)
+
+
+def _worker_entry(target, args):
+    """Child side: plain signal behaviour whatever the parent installed, then the real target"""
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    target(*args)
+
+
+def spawn_worker(ctx, target, args=(), daemon=True):
+    """Start target(*args) in a process from the spawn context ctx and return the started process.
+
+    A spawned child normally re-imports the parent's __main__ (app.py, Flask and the signal
+    handlers it installs) as __mp_main__. While the process starts, __main__ points at this
+    stdlib-only module instead, so the child imports just what target needs.
+    """
+    process = ctx.Process(target=_worker_entry, args=(target, args), daemon=daemon)
+    with _start_lock:
+        main_module = sys.modules['__main__']
+        sys.modules['__main__'] = sys.modules[__name__]
+        try:
+            process.start()
+        finally:
+            sys.modules['__main__'] = main_module
+    return process
@@ -0,0 +1,227 @@
+import abc
+import ast
+import os
+import threading
+import time
+import cv2
+import numpy as np
+import yaml
+from ultralytics import YOLO
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+try:
+    import openvino as ov
+except ImportError:
+    ov = None
+
+
+# One row per detection: box corners, confidence and class id
+DETECTION_DTYPE = np.dtype([('xyxy', np.float32, (4,)), ('conf', np.float32), ('cls', np.int32)])
+
+
+def results_to_detections(result):
+    """Convert one ultralytics result into a DETECTION_DTYPE array with a single device transfer"""
+    data = result.boxes.data.cpu().numpy()  # N x 6: x1, y1, x2, y2, conf, cls
+    detections = np.empty(len(data), dtype=DETECTION_DTYPE)
+    detections['xyxy'] = data[:, :4]
+    detections['conf'] = data[:, 4]
+    detections['cls'] = data[:, 5]
+    return detections
+
+
+def load_yolo(model_path):
+    """Load an ultralytics model with console output suppressed"""
+    os.environ['YOLO_VERBOSE'] = 'False'
+    model = YOLO(model_path)
+    model.verbose = False
+    return model
+
+
+def export_model(model_path, export_format, imgsz):
+    """Export weights to onnx or openvino once and return the exported path"""
+    stem = os.path.splitext(model_path)[0]
+    exported = f"{stem}.onnx" if export_format == 'onnx' else f"{stem}_openvino_model"
+    if not os.path.exists(exported):
+        print(f"Exporting {model_path} to {export_format} at {imgsz}px...")
+        exported = load_yolo(model_path).export(format=export_format, imgsz=imgsz, dynamic=True)
+    return exported
+
+
+class TorchBackend:
+    """Run the model through ultralytics on PyTorch"""
+    name = 'torch'
+
+    def __init__(self, model_path="yolov8n.pt", imgsz=640, threads=None):
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.imgsz = imgsz
+        self.model = load_yolo(model_path)
+        # Ultralytics predictors are not thread-safe and a shared backend is called from several threads
+        self.lock = threading.Lock()
+        names = self.model.names
+        self.class_names = np.array([names[i] for i in range(len(names))], dtype=object)
+
+    def predict(self, frames, conf=0.5, classes=None, max_det=50):
+        """Return one DETECTION_DTYPE array per frame"""
+        with self.lock:
+            results = self.model.predict(frames, imgsz=self.imgsz, conf=conf, classes=classes,
+                                         max_det=max_det, verbose=False)
+        return [results_to_detections(r) for r in results]
+
+
+class ExportedBackend(abc.ABC):
+    """Shared letterbox pre-processing and YOLOv8 output decoding for exported models"""
+    name = None
+
+    def __init__(self, imgsz=640):
+        self.imgsz = imgsz
+        self.class_names = np.zeros(0, dtype=object)
+        # Only the runtime call is serialized; pre- and post-processing of other threads overlap it
+        self.lock = threading.Lock()
+
+    def preprocess(self, frames):
+        """Letterbox frames into one NCHW float32 batch; returns (batch, [(ratio, pad_x, pad_y, w, h)])"""
+        batch = np.full((len(frames), self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        transforms = []
+        for i, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            ratio = min(self.imgsz / h, self.imgsz / w)
+            new_w, new_h = round(w * ratio), round(h * ratio)
+            pad_x, pad_y = (self.imgsz - new_w) // 2, (self.imgsz - new_h) // 2
+            batch[i, pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(frame, (new_w, new_h))
+            transforms.append((ratio, pad_x, pad_y, w, h))
+        tensor = batch[..., ::-1].transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+        return np.ascontiguousarray(tensor), transforms
+
+    def postprocess(self, output, transforms, conf, classes, max_det):
+        """Decode a (N, 4 + classes, anchors) output with per-class NMS"""
+        all_detections = []
+        for preds, (ratio, pad_x, pad_y, w, h) in zip(output, transforms):
+            preds = preds.T
+            scores = preds[:, 4:]
+            cls = scores.argmax(axis=1)
+            best = scores[np.arange(len(cls)), cls]
+            keep = best >= conf
+            if classes is not None:
+                keep &= np.isin(cls, classes)
+            boxes, best, cls = preds[keep, :4], best[keep], cls[keep]
+
+            xyxy = np.empty_like(boxes)
+            xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+            xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+            # Offset boxes by class so one NMS call never suppresses across classes
+            offset = (cls * 4096)[:, None].astype(np.float32)
+            nms_boxes = np.concatenate([xyxy[:, :2] + offset, boxes[:, 2:]], axis=1)
+            indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), best.tolist(), conf, 0.7, top_k=max_det)
+            indices = np.array(indices, dtype=int).reshape(-1)[:max_det]
+
+            detections = np.empty(len(indices), dtype=DETECTION_DTYPE)
+            scaled = (xyxy[indices] - [pad_x, pad_y, pad_x, pad_y]) / ratio
+            detections['xyxy'] = np.clip(scaled, 0, [w, h, w, h])
+            detections['conf'] = best[indices]
+            detections['cls'] = cls[indices]
+            all_detections.append(detections)
+        return all_detections
+
+    @abc.abstractmethod
+    def run(self, tensor):
+        """Run the exported model on an NCHW float32 batch and return its raw output"""
+
+    def predict(self, frames, conf=0.5, classes=None, max_det=50):
+        """Return one DETECTION_DTYPE array per frame"""
+        tensor, transforms = self.preprocess(frames)
+        with self.lock:
+            output = self.run(tensor)
+        return self.postprocess(output, transforms, conf, classes, max_det)
+
+
+class OnnxRuntimeBackend(ExportedBackend):
+    """Run an ONNX export through ONNX Runtime on the CPU"""
+    name = 'onnxruntime'
+
+    def __init__(self, model_path="yolov8n.pt", imgsz=640, threads=None):
+        super().__init__(imgsz)
+        if not model_path.endswith('.onnx'):
+            model_path = export_model(model_path, 'onnx', imgsz)
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        names = ast.literal_eval(self.session.get_modelmeta().custom_metadata_map['names'])
+        self.class_names = np.array([names[i] for i in range(len(names))], dtype=object)
+
+    def run(self, tensor):
+        return self.session.run(None, {self.input_name: tensor})[0]
+
+
+class OpenVINOBackend(ExportedBackend):
+    """Run an OpenVINO export on the CPU plugin"""
+    name = 'openvino'
+
+    def __init__(self, model_path="yolov8n.pt", imgsz=640, threads=None):
+        super().__init__(imgsz)
+        if not os.path.isdir(model_path):
+            model_path = export_model(model_path, 'openvino', imgsz)
+        xml_path = next(os.path.join(model_path, f) for f in os.listdir(model_path) if f.endswith('.xml'))
+        config = {'INFERENCE_NUM_THREADS': threads} if threads else {}
+        self.model = ov.Core().compile_model(xml_path, 'CPU', config)
+        with open(os.path.join(model_path, 'metadata.yaml')) as f:
+            names = yaml.safe_load(f)['names']
+        self.class_names = np.array([names[i] for i in range(len(names))], dtype=object)
+
+    def run(self, tensor):
+        return self.model(tensor)[0]
+
+
+BACKENDS = {'torch': TorchBackend, 'onnxruntime': OnnxRuntimeBackend, 'openvino': OpenVINOBackend}
+
+
+def available_backends():
+    """Names of the backends whose runtime is installed, fastest first"""
+    names = []
+    if ov is not None:
+        names.append('openvino')
+    if ort is not None:
+        names.append('onnxruntime')
+    names.append('torch')
+    return names
+
+
+def create_backend(name='torch', model_path="yolov8n.pt", imgsz=640, threads=None, warmup=1):
+    """Create a backend by name ('auto' picks the fastest installed one) and warm it up"""
+    if name == 'auto':
+        name = available_backends()[0]
+    if name not in available_backends():
+        raise ValueError(f"Backend '{name}' is not available, choose from {available_backends()}")
+
+    backend = BACKENDS[name](model_path, imgsz, threads)
+    # The first calls allocate buffers and pick kernels, keep that out of the capture loop
+    dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    for _ in range(warmup):
+        backend.predict([dummy])
+    if warmup:
+        print(f"{name} backend warmed up in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return backend
+
+
+# Backends by configuration, so several trackers can share one loaded model
+_shared_backends = {}
+_shared_backends_lock = threading.Lock()
+
+
+def get_shared_backend(name='torch', model_path="yolov8n.pt", imgsz=640, threads=None):
+    """Create a backend once per process and return the shared instance"""
+    if name == 'auto':
+        name = available_backends()[0]
+    key = (name, model_path, imgsz, threads)
+    with _shared_backends_lock:
+        if key not in _shared_backends:
+            _shared_backends[key] = create_backend(name, model_path, imgsz, threads)
+        return _shared_backends[key]
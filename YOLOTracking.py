@@ -1,79 +1,352 @@
 import cv2
-from ultralytics import YOLO
-import os
 import threading
 import time
+import math
+from collections import deque, namedtuple
 import numpy as np
+from YOLOBackends import DETECTION_DTYPE, get_shared_backend
+from TrackerMetrics import TrackerMetrics
+from CameraBroker import CameraClient, open_camera
 
 
-class YOLOTracker:
+# Immutable view of one published result. Arrays are read-only and shared, never copied:
+# processed_frame lives in a reused ring (ANNOTATION_BUFFERS), so readers keeping it longer copy it.
+TrackerSnapshot = namedtuple('TrackerSnapshot', ['seq', 'timestamp', 'frame', 'processed_frame',
+                                                 'detections', 'objects'])
+
+# The annotated frame of a snapshot stays valid for this many publishes; copy it to keep it longer
+ANNOTATION_BUFFERS = 3
+
+
+def read_only(array):
+    """Return a read-only view of array without copying it"""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class SnapshotPublisher:
+    """Build snapshots, drawing annotations into a ring of reused buffers"""
+
+    def __init__(self, num_buffers=ANNOTATION_BUFFERS):
+        self.buffers = [None] * num_buffers
+        self.index = 0
+        self.seq = 0
+
+    def publish(self, frame, detections, objects, timestamp):
+        """Return a new TrackerSnapshot for frame with detections drawn on it"""
+        buffer = self.buffers[self.index]
+        if buffer is None or buffer.shape != frame.shape:
+            buffer = self.buffers[self.index] = np.empty_like(frame)
+        self.index = (self.index + 1) % len(self.buffers)
+
+        np.copyto(buffer, frame)
+        draw_detections(buffer, detections['xyxy'], objects)
+        self.seq += 1
+        return TrackerSnapshot(self.seq, timestamp, read_only(frame), read_only(buffer),
+                               read_only(detections), tuple(objects))
+
+
+class FrameMailbox:
+    """One-slot handoff where a newer frame replaces an unread one"""
+
     def __init__(self):
-        # Suppress YOLO console output
-        os.environ['YOLO_VERBOSE'] = 'False'
-        self.model = YOLO("yolov8n.pt")
-        self.model.verbose = False
+        self.condition = threading.Condition()
+        self.frame = None
+        self.timestamp = 0.0
+        self.seq = 0
+        self.taken_seq = 0
+        self.dropped = 0
+
+    def put(self, frame, timestamp):
+        """Publish a frame, dropping the previous one if nobody took it"""
+        with self.condition:
+            if self.seq > self.taken_seq:
+                self.dropped += 1
+            self.frame = frame
+            self.timestamp = timestamp
+            self.seq += 1
+            self.condition.notify()
+
+    def take(self, timeout=0.5):
+        """Wait for a frame newer than the last one taken; returns (seq, frame, timestamp) or None"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > self.taken_seq, timeout):
+                return None
+            self.taken_seq = self.seq
+            return self.seq, self.frame, self.timestamp
+
+
+class DetectionScheduler:
+    """Choose how many frames to skip between full detections"""
+
+    def __init__(self, cpu_budget=0.5, target_fps=None, max_interval=8, smoothing=0.2):
+        self.cpu_budget = cpu_budget  # Fraction of wall time inference may use
+        self.target_fps = target_fps  # If set, keep the average per-frame cost under 1 / target_fps
+        self.max_interval = max_interval
+        self.smoothing = smoothing
+        self.interval = 1
+        self.inference_time = None
+        self.frame_time = None
+        self.last_frame_time = None
+        self.frames_since_detection = 0
+
+    def _average(self, current, sample):
+        if current is None:
+            return sample
+        return current + self.smoothing * (sample - current)
+
+    def tick(self):
+        """Record a new frame and return True if it should get full detection"""
+        now = time.time()
+        if self.last_frame_time is not None:
+            self.frame_time = self._average(self.frame_time, now - self.last_frame_time)
+        self.last_frame_time = now
+
+        self.frames_since_detection += 1
+        if self.frames_since_detection >= self.interval:
+            self.frames_since_detection = 0
+            return True
+        return False
+
+    def record_inference(self, seconds):
+        """Update the detection interval from the latest inference time"""
+        self.inference_time = self._average(self.inference_time, seconds)
+        if self.target_fps:
+            interval = self.inference_time * self.target_fps
+        elif self.frame_time:
+            interval = self.inference_time / (self.cpu_budget * self.frame_time)
+        else:
+            return
+        self.interval = max(1, min(self.max_interval, math.ceil(interval)))
+
+
+class MotionGate:
+    """Skip inference while a downsampled frame stays close to the one last sent to the model"""
+
+    def __init__(self, threshold=6.0, max_staleness=2.0, size=(64, 36)):
+        self.threshold = threshold          # Mean absolute grey-level difference that counts as change
+        self.max_staleness = max_staleness  # Seconds after which inference runs regardless
+        self.size = size
+        self.reference = None
+        self.reference_time = 0.0
+        self.last_score = 0.0
+        self.checked = 0
+        self.skipped = 0
+
+    def should_run(self, frame):
+        """Return True if the scene changed or the cached detections are too old"""
+        small = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        now = time.time()
+        self.checked += 1
+
+        if self.reference is None or now - self.reference_time >= self.max_staleness:
+            run = True
+        else:
+            self.last_score = float(cv2.absdiff(small, self.reference).mean())
+            run = self.last_score >= self.threshold
+
+        if run:
+            self.reference = small
+            self.reference_time = now
+        else:
+            self.skipped += 1
+        return run
+
+
+class BoxPropagator:
+    """Move boxes between detections with sparse optical flow on a downscaled frame"""
+
+    def __init__(self, scale=0.5, grid=3):
+        self.scale = scale
+        self.grid = grid
+        self.prev_gray = None
+        offsets = (np.arange(grid) + 0.5) / grid
+        gx, gy = np.meshgrid(offsets, offsets)
+        self.grid_x = gx.ravel()
+        self.grid_y = gy.ravel()
+
+    def _gray(self, frame):
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def reset(self, frame):
+        """Use frame as the reference for the boxes from a fresh detection"""
+        self.prev_gray = self._gray(frame)
+
+    def propagate(self, frame, boxes):
+        """Return boxes (N x 4 xyxy) shifted by the median flow of points inside each box"""
+        gray = self._gray(frame)
+        prev_gray, self.prev_gray = self.prev_gray, gray
+        if prev_gray is None or len(boxes) == 0:
+            return boxes
+
+        scaled = boxes * self.scale
+        xs = scaled[:, 0:1] + (scaled[:, 2:3] - scaled[:, 0:1]) * self.grid_x
+        ys = scaled[:, 1:2] + (scaled[:, 3:4] - scaled[:, 1:2]) * self.grid_y
+        points = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2).astype(np.float32)
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None,
+                                                         winSize=(15, 15), maxLevel=2)
+
+        flow = (new_points - points).reshape(len(boxes), -1, 2)
+        tracked = status.reshape(len(boxes), -1).astype(bool)
+        moved = boxes.astype(np.float32)
+        for i in range(len(boxes)):
+            if tracked[i].any():
+                dx, dy = np.median(flow[i][tracked[i]], axis=0) / self.scale
+                moved[i] += (dx, dy, dx, dy)
+        return moved
+
+
+def draw_detections(frame, boxes, labels):
+    """Draw labelled boxes onto frame in place"""
+    for (x1, y1, x2, y2), label in zip(boxes.astype(int), labels):
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    return frame
+
+
+class YOLOTracker:
+    def __init__(self, cpu_budget=0.5, target_fps=None, max_interval=8,
+                 conf_threshold=0.5, classes=None, max_det=50, backend='torch', imgsz=640, threads=None,
+                 motion_threshold=6.0, max_staleness=2.0):
+        # backend is a YOLOBackends name ('torch', 'onnxruntime', 'openvino', 'auto') or an instance
+        if isinstance(backend, str):
+            backend = get_shared_backend(backend, imgsz=imgsz, threads=threads)
+        self.backend = backend
+        # Filtering happens inside inference instead of on the returned boxes
+        self.conf_threshold = conf_threshold
+        self.classes = classes
+        self.max_det = max_det
+        self.class_names = backend.class_names
         self.running = False
         self.thread = None
-        self.frame = None
-        self.processed_frame = None
-        self.detected_objects = []
+        self.grab_thread = None
+        self.mailbox = FrameMailbox()
+        self.metrics = TrackerMetrics()
+        # Readers take self.snapshot without locking; it is replaced, never modified
+        self.publisher = SnapshotPublisher()
+        self.snapshot = None
         self.lock = threading.Lock()
         self.display_enabled = True
+        # {label: best confidence} for each of the most recent detection passes
+        self.detection_history = deque(maxlen=30)
+        # Full detection runs every few frames, boxes are propagated in between
+        self.scheduler = DetectionScheduler(cpu_budget, target_fps, max_interval)
+        self.propagator = BoxPropagator()
+        # Static scenes reuse the cached detections instead of running inference
+        self.motion_gate = MotionGate(motion_threshold, max_staleness)
+        # Accumulated by the gate in inference_loop, so it must exist before the first skip
+        self.metrics.set('inference_seconds_saved', 0.0)
+
+    def labels_for(self, detections):
+        """Class names for a detections array"""
+        return self.class_names[detections['cls']].tolist()
 
-    def detect_objects(self, frame):
-        detected_objects = []
-        processed_frame = frame.copy()
+    def detect_objects(self, frame, draw=True):
+        """Run inference and return (annotated frame or None, DETECTION_DTYPE array)"""
+        detections = np.zeros(0, dtype=DETECTION_DTYPE)
 
         # Use the silent parameter to suppress terminal output during inference
         try:
-            for r in self.model.predict(frame, verbose=False):
-                for box in r.boxes:
-                    if box.conf[0].item() > 0.5:
-                        label = self.model.names[int(box.cls[0])]
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        cv2.rectangle(processed_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                        cv2.putText(processed_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0),
-                                    2)
-                        detected_objects.append(label)
+            detections = self.backend.predict([frame], conf=self.conf_threshold, classes=self.classes,
+                                              max_det=self.max_det)[0]
         except Exception as e:
             print(f"Error in object detection: {e}")
 
-        return processed_frame, detected_objects
+        processed_frame = None
+        if draw:
+            processed_frame = draw_detections(frame.copy(), detections['xyxy'], self.labels_for(detections))
+        return processed_frame, detections
 
-    def capture_loop(self):
-        """Thread function to capture frames only"""
-        cap = cv2.VideoCapture(0)
-        self.running = True
+    def grab_loop(self):
+        """Thread function that keeps draining the camera into the mailbox"""
+        cap = open_camera(0)
+        # Frames outlive the broker's ring slot in snapshots, so take a private copy
+        read = (lambda: cap.read(copy=True)) if isinstance(cap, CameraClient) else cap.read
 
         while self.running:
-            ret, frame = cap.read()
+            start = time.perf_counter()
+            ret, frame = read()
             if not ret:
                 print("Failed to capture frame")
                 time.sleep(0.1)
                 continue
+            self.metrics.observe('grab', time.perf_counter() - start)
+            self.mailbox.put(frame, time.time())
+            self.metrics.count('frames_grabbed')
+
+        cap.release()
+        print("Grab thread stopped")
+
+    def inference_loop(self):
+        """Thread function that processes the freshest grabbed frame"""
+        objects = []
+        detections = np.zeros(0, dtype=DETECTION_DTYPE)
+        last_scores = None  # {label: confidence} of the last real detection
+
+        while self.running:
+            item = self.mailbox.take()
+            if item is None:
+                continue
+            _, frame, grabbed_at = item
 
             # Process the frame
             try:
-                processed_frame, objects = self.detect_objects(frame)
+                scores = None
+                detection_due = self.scheduler.tick()
+                if detection_due and not self.motion_gate.should_run(frame):
+                    # Nothing moved: keep the cached detections and their boxes. The pass still counts
+                    # toward stability, or a still object held up would never become a stable detection
+                    scores = last_scores
+                    self.metrics.count('gate_skips')
+                    self.metrics.gauges['inference_seconds_saved'] += self.scheduler.inference_time or 0.0
+                    postprocess_start = time.perf_counter()
+                elif detection_due:
+                    start = time.perf_counter()
+                    _, detections = self.detect_objects(frame, draw=False)
+                    postprocess_start = time.perf_counter()
+                    self.scheduler.record_inference(postprocess_start - start)
+                    self.metrics.observe('inference', postprocess_start - start)
+                    self.metrics.count('inferences')
+                    self.propagator.reset(frame)
+                    objects = self.labels_for(detections)
+
+                    scores = {}
+                    for cls in np.unique(detections['cls']):
+                        scores[self.class_names[cls]] = float(detections['conf'][detections['cls'] == cls].max())
+                    last_scores = scores
+                else:
+                    # Cheap update between detections keeps the overlay in step with the frame
+                    postprocess_start = time.perf_counter()
+                    detections = detections.copy()
+                    detections['xyxy'] = self.propagator.propagate(frame, detections['xyxy'])
+
+                # Swapping the reference is atomic, so readers never see a half-updated state
+                self.snapshot = self.publisher.publish(frame, detections, objects, grabbed_at)
+                if scores is not None:
+                    with self.lock:
+                        self.detection_history.append(scores)
 
-                # Update the shared data with lock to prevent race conditions
-                with self.lock:
-                    self.frame = frame.copy()
-                    self.processed_frame = processed_frame
-                    self.detected_objects = objects.copy()
+                # Post-processing covers propagation, labels and drawing the published snapshot
+                self.metrics.observe('postprocess', time.perf_counter() - postprocess_start)
+                # Glass-to-detection latency: camera read to published result
+                self.metrics.frame_published(grabbed_at)
+                self.metrics.counters['frames_dropped'] = self.mailbox.dropped
+                self.metrics.set('gate_ratio', self.motion_gate.skipped / max(self.motion_gate.checked, 1))
             except Exception as e:
                 print(f"Error processing frame: {e}")
 
-            time.sleep(0.01)  # Small delay to prevent high CPU usage
-
-        cap.release()
-        print("Capture thread stopped")
+        print("Inference thread stopped")
 
     def start(self):
         """Start the YOLO tracking"""
         if self.thread is None or not self.thread.is_alive():
             self.running = True
-            self.thread = threading.Thread(target=self.capture_loop)
+            self.grab_thread = threading.Thread(target=self.grab_loop)
+            self.grab_thread.daemon = True
+            self.grab_thread.start()
+            self.thread = threading.Thread(target=self.inference_loop)
             self.thread.daemon = True
             self.thread.start()
             return True
@@ -82,22 +355,65 @@ class YOLOTracker:
     def stop(self):
         """Stop the YOLO tracking"""
         self.running = False
-        if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=1.0)
-            self.thread = None
+        for thread in (self.grab_thread, self.thread):
+            if thread and thread.is_alive():
+                thread.join(timeout=1.0)
+        self.thread = None
+        self.grab_thread = None
         # DO NOT call cv2.destroyAllWindows() here - let the main thread handle GUI
 
+    def get_snapshot(self):
+        """Get the latest TrackerSnapshot, or None before the first frame"""
+        return self.snapshot
+
     def get_latest_frame(self):
-        """Get the latest processed frame (for external use)"""
-        with self.lock:
-            if self.processed_frame is not None:
-                return self.processed_frame.copy()
-            return None
+        """Get a copy of the latest processed frame (for external use)"""
+        # The snapshot's annotated frame is overwritten after ANNOTATION_BUFFERS publishes, so callers
+        # that may hold it longer get their own copy; use get_snapshot() for zero-copy access
+        snapshot = self.snapshot
+        return snapshot.processed_frame.copy() if snapshot else None
+
+    def get_detections(self):
+        """Get the latest read-only DETECTION_DTYPE array (for external use)"""
+        snapshot = self.snapshot
+        return snapshot.detections if snapshot else np.zeros(0, dtype=DETECTION_DTYPE)
+
+    def get_latest_raw_frame(self):
+        """Get a copy of the latest camera frame without annotations (for external use)"""
+        snapshot = self.snapshot
+        return snapshot.frame.copy() if snapshot else None
 
     def get_detected_objects(self):
-        """Get the latest detected objects (for external use)"""
+        """Get the latest detected objects as a list (for external use)"""
+        snapshot = self.snapshot
+        return list(snapshot.objects) if snapshot else []
+
+    def get_stats(self):
+        """Get counters, gauges and per-stage latency histograms (see TrackerMetrics)"""
+        return self.metrics.snapshot()
+
+    def get_stable_detection(self, num_frames=10, min_conf=0.7, ignore=("person",)):
+        """Return (label, mean confidence) for the object seen in each of the last num_frames detections, or None"""
         with self.lock:
-            return self.detected_objects.copy()
+            if len(self.detection_history) < num_frames:
+                return None
+            recent = list(self.detection_history)[-num_frames:]
+
+        best = None
+        for label in recent[-1]:
+            if label in ignore:
+                continue
+            confs = [scores.get(label, 0.0) for scores in recent]
+            if min(confs) < min_conf:
+                continue
+            mean_conf = sum(confs) / len(confs)
+            if best is None or mean_conf > best[1]:
+                best = (label, mean_conf)
+        return best
+
+    def is_running(self):
+        """Check whether the capture thread is alive"""
+        return self.running and self.thread is not None and self.thread.is_alive()
 
     def enable_display(self, enable=True):
         """Enable or disable frame display"""
@@ -108,11 +424,11 @@ class YOLOTracker:
 tracker = None
 
 
-def YOLOTracking():
+def YOLOTracking(cpu_budget=0.5, target_fps=None, backend='torch', imgsz=640, threads=None):
     """Initialize and start the YOLO tracking"""
     global tracker
     if tracker is None:
-        tracker = YOLOTracker()
+        tracker = YOLOTracker(cpu_budget, target_fps, backend=backend, imgsz=imgsz, threads=threads)
 
     if not tracker.start():
         print("Tracker already running")
@@ -137,6 +453,14 @@ def GetLatestFrame():
     return None
 
 
+def GetLatestRawFrame():
+    """Get the latest camera frame without detections drawn on it"""
+    global tracker
+    if tracker and tracker.is_running():
+        return tracker.get_latest_raw_frame()
+    return None
+
+
 def GetDetectedObjects():
     """Get list of latest detected objects"""
     global tracker
@@ -145,11 +469,29 @@ def GetDetectedObjects():
     return []
 
 
+def GetStableDetection(num_frames=10, min_conf=0.7):
+    """Get (label, confidence) for a consistently detected object, or None"""
+    global tracker
+    if tracker and tracker.is_running():
+        return tracker.get_stable_detection(num_frames, min_conf)
+    return None
+
+
+def GetTrackerStats():
+    """Get the metrics snapshot of the global tracker"""
+    global tracker
+    if tracker:
+        return tracker.get_stats()
+    return None
+
+
 def DisplayFrames():
     """Display frames in the main thread - call this from the main loop"""
     global tracker
     if tracker and tracker.display_enabled:
-        frame = tracker.get_latest_frame()
+        # imshow copies the frame into the window, so the snapshot's buffer is enough
+        snapshot = tracker.get_snapshot()
+        frame = snapshot.processed_frame if snapshot else None
         if frame is not None:
             try:
                 cv2.imshow("AI Vision", frame)
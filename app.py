@@ -1,4 +1,4 @@
-from flask import Flask, render_template_string, jsonify, url_for, send_from_directory
+from flask import Flask, Response, render_template_string, jsonify, url_for, send_from_directory
 import threading
 import queue
 import os
@@ -7,10 +7,12 @@ import time
 import logging
 import signal
 import atexit
-import hashlib
 import subprocess
-import importlib
-from main import main as main_function
+from TrackerMetrics import render_prometheus
+from ResponseCache import render_cache_prometheus
+from CameraBroker import CameraBroker
+from MediaStore import MediaStore
+from AssistantProcess import AssistantSupervisor
 
 # Configure Flask to silence the default logging
 app = Flask(__name__)
@@ -28,88 +30,43 @@ os.makedirs(STATIC_FOLDER, exist_ok=True)
 # Queue for transcript messages
 transcript_queue = queue.Queue()
 
-# File monitoring
-monitored_files = {
-    'video': {
-        'path': os.path.join(STATIC_FOLDER, 'final_video.mp4'),
-        'last_modified': 0,
-        'hash': None
-    },
-    'image': {
-        'path': os.path.join(STATIC_FOLDER, 'latest_frame.jpg'),
-        'last_modified': 0,
-        'hash': None
-    }
-}
-
-whiteboard_process = None
+# Read-only view of the media library the assistant process writes to
+media_store = MediaStore()
 
+# Media URLs never change content, so browsers may cache them for a year
+MEDIA_MAX_AGE = 365 * 24 * 3600
 
-# Redirect stdout from main.py to transcript_queue
-class StreamToQueue:
-    def __init__(self, q):
-        self.q = q
-        self.original_stdout = sys.stdout
+whiteboard_process = None
 
-    def write(self, message):
-        message = message.strip()
-        if message:
-            self.q.put(message)
-            # Also write to original stdout for debugging
-            self.original_stdout.write(message + '\n')
-            self.original_stdout.flush()
+# One process owns the webcam; the assistant, tracker and whiteboard attach to its frames
+camera_broker = CameraBroker()
 
-    def flush(self):
-        self.original_stdout.flush()
 
+def handle_assistant_event(event):
+    """Turn events from the assistant process into transcript lines and server state"""
+    if event['type'] == 'transcript':
+        transcript_queue.put(event['text'])
+    elif event['type'] == 'user_input':
+        intercept_whiteboard_calls(event['text'])
+    elif event['type'] == 'status' and event['state'] == 'error':
+        transcript_queue.put(f"Error in main function: {event.get('error')}")
 
-# Global variable to control the main thread
-main_thread_running = False
-main_thread = None
 
+# The assistant runs in its own process and streams events back over a pipe
+assistant = AssistantSupervisor(handle_assistant_event)
 
-def get_file_hash(filepath):
-    """Get a hash of the file to detect content changes"""
-    if not os.path.exists(filepath):
-        return None
 
-    try:
-        with open(filepath, 'rb') as f:
-            return hashlib.md5(f.read()).hexdigest()
-    except:
-        return None
-
-
-def check_for_file_updates():
-    """Check if monitored files have been updated"""
-    updates = {'video': False, 'image': False}
-
-    for file_type, info in monitored_files.items():
-        filepath = info['path']
-
-        # Check if file exists
-        if not os.path.exists(filepath):
-            # Check if it exists in root directory
-            root_file = os.path.basename(filepath)
-            if os.path.exists(root_file):
-                # Copy file to static folder
-                import shutil
-                shutil.copy2(root_file, filepath)
-                updates[file_type] = True
-                monitored_files[file_type]['last_modified'] = os.path.getmtime(filepath)
-                monitored_files[file_type]['hash'] = get_file_hash(filepath)
-            continue
-
-        # Check if file has been modified
-        current_mtime = os.path.getmtime(filepath)
-        current_hash = get_file_hash(filepath)
-
-        if (current_mtime > monitored_files[file_type]['last_modified'] or
-                current_hash != monitored_files[file_type]['hash']):
-            updates[file_type] = True
-            monitored_files[file_type]['last_modified'] = current_mtime
-            monitored_files[file_type]['hash'] = current_hash
-    return updates
+def latest_media():
+    """Immutable URL, thumbnail and metadata of the newest video and image in the media library"""
+    media = {}
+    for kind in ('video', 'image'):
+        entry = media_store.latest(kind)
+        if entry:
+            entry['url'] = url_for('serve_media', filename=entry['file'])
+            if entry['thumbnail']:
+                entry['thumbnail_url'] = url_for('serve_media', filename=entry['thumbnail'])
+        media[kind] = entry
+    return media
 
 
 def run_whiteboard():
@@ -139,51 +96,14 @@ def run_whiteboard():
 
 def intercept_whiteboard_calls(user_input):
     """Monitor for whiteboard requests in the main function"""
-    if ("teach me" in user_input.lower() or "learn" in user_input.lower()) and main_thread_running:
+    if ("teach me" in user_input.lower() or "learn" in user_input.lower()) and assistant.is_running():
         # Launch whiteboard in separate thread to not block main thread
         threading.Thread(target=run_whiteboard, daemon=True).start()
 
 
-def modified_main():
-    """Modified version of main.py's main function that intercepts whiteboard calls"""
-    from main import main as original_main
-
-    # Import get_voice_input to monkey patch it
-    from main import get_voice_input as original_get_voice_input
-    import main
-
-    # Create a patched version of get_voice_input
-    def patched_get_voice_input():
-        user_input = original_get_voice_input()
-        if user_input:
-            intercept_whiteboard_calls(user_input)
-        return user_input
-
-    # Monkey patch the function
-    main.get_voice_input = patched_get_voice_input
-
-    # Run the original main
-    original_main()
-
-
-def run_main():
-    global main_thread_running
-    main_thread_running = True
-    sys.stdout = StreamToQueue(transcript_queue)
-
-    try:
-        main_function()
-    except Exception as e:
-        transcript_queue.put(f"Error in main function: {e}")
-    finally:
-        main_thread_running = False
-        sys.stdout = sys.__stdout__
-
-
 def cleanup():
     """Clean up resources before exit"""
-    global main_thread_running
-    main_thread_running = False
+    assistant.stop(timeout=2.0)
     # Terminate whiteboard process if running
     if whiteboard_process and whiteboard_process.poll() is None:
         try:
@@ -191,31 +111,18 @@ def cleanup():
         except:
             pass
 
+    camera_broker.stop()
     print("Cleaning up resources...")
 
 
-# Register cleanup function
-atexit.register(cleanup)
-
-# Register signal handlers
-signal.signal(signal.SIGINT, lambda s, f: cleanup())
-signal.signal(signal.SIGTERM, lambda s, f: cleanup())
-
-
 @app.route('/')
 def index():
     """Render the main application page"""
-    current_time = int(time.time())
-
-    # Initialize file information
-    for file_type, info in monitored_files.items():
-        if os.path.exists(info['path']):
-            monitored_files[file_type]['last_modified'] = os.path.getmtime(info['path'])
-            monitored_files[file_type]['hash'] = get_file_hash(info['path'])
-
-    # Check if video and image exist
-    has_video = os.path.exists(monitored_files['video']['path'])
-    has_image = os.path.exists(monitored_files['image']['path'])
+    media = latest_media()
+    has_video = media['video'] is not None
+    has_image = media['image'] is not None
+    video_url = media['video']['url'] if has_video else ''
+    image_url = media['image']['url'] if has_image else ''
 
     html = """
   <!DOCTYPE html>
@@ -391,9 +298,10 @@ def index():
       <script>
           // Global variable to track if main program is running
           let isMainRunning = false;
-          let mediaTimestamps = {
-              video: 0,
-              image: 0
+          // URLs of the media on display; a new item in the library gets a new URL
+          let mediaUrls = {
+              video: '{{ video_url }}',
+              image: '{{ image_url }}'
           };
 
 
@@ -436,16 +344,16 @@ def index():
 
 
                       // Check if there are updates
-                      if (data.hasVideo && (data.videoTimestamp > mediaTimestamps.video)) {
-                          mediaTimestamps.video = data.videoTimestamp;
+                      if (data.hasVideo && data.videoUrl !== mediaUrls.video) {
+                          mediaUrls.video = data.videoUrl;
                           updateNeeded = true;
 
 
 
 
-                          // Update video element with cache-busting timestamp
+                          // Content-addressed URL, so no cache busting is needed
                           const videoSrc = document.getElementById('videoSrc');
-                          videoSrc.src = `{{ url_for('static', filename='final_video.mp4') }}?t=${Date.now()}`; // removed static
+                          videoSrc.src = data.videoUrl;
 
 
 
@@ -465,16 +373,15 @@ def index():
 
 
 
-                      if (data.hasImage && (data.imageTimestamp > mediaTimestamps.image)) {
-                          mediaTimestamps.image = data.imageTimestamp;
+                      if (data.hasImage && data.imageUrl !== mediaUrls.image) {
+                          mediaUrls.image = data.imageUrl;
                           updateNeeded = true;
 
 
 
 
-                          // Update image element with cache-busting timestamp
                           const imgElement = document.getElementById('capturedImage');
-                          imgElement.src = `{{ url_for('static', filename='latest_frame.jpg') }}?t=${Date.now()}`;
+                          imgElement.src = data.imageUrl;
 
 
 
@@ -565,11 +472,11 @@ def index():
               // Force browser to reload the media
               if (type === 'video') {
                   const videoSrc = document.getElementById('videoSrc');
-                  videoSrc.src = `{{ url_for('static', filename='final_video.mp4') }}?t=${Date.now()}`;
+                  videoSrc.src = mediaUrls.video;
                   document.getElementById('videoPlayer').load();
               } else if (type === 'image') {
                   const imgElement = document.getElementById('capturedImage');
-                  imgElement.src = `{{ url_for('static', filename='latest_frame.jpg') }}?t=${Date.now()}`;
+                  imgElement.src = mediaUrls.image;
               }
           }
 
@@ -648,11 +555,11 @@ def index():
           <div class="top-right">
               <div class="media-container">
                   <video controls id="videoPlayer" style="display: {{ 'block' if has_video else 'none' }};">
-                      <source id="videoSrc" src="{{ url_for('static', filename='final_video.mp4', t=current_time) }}"
+                      <source id="videoSrc" src="{{ video_url }}"
                               type="video/mp4" onerror="this.style.display='none';">
                       Your browser does not support the video tag.
                   </video>
-                  <img id="capturedImage" src="{{ url_for('static', filename='latest_frame.jpg', t=current_time) }}"
+                  <img id="capturedImage" src="{{ image_url }}"
                        style="display: {{ 'block' if has_image and not has_video else 'none' }};"
                        onerror="this.style.display='none';">
                   <button class="refresh-btn" onclick="refreshMedia('video')">⟳ Refresh Video</button>
@@ -667,23 +574,41 @@ def index():
   </body>
   </html>
   """
-    return render_template_string(html, current_time=current_time)
+    return render_template_string(html, has_video=has_video, has_image=has_image,
+                                  video_url=video_url, image_url=image_url)
 
 
 @app.route('/check_media')
 def check_media():
-    """Check for media updates and return their status"""
-    updates = check_for_file_updates()
-
+    """Return the URLs and metadata of the newest media in the library"""
+    media = latest_media()
+    video, image = media['video'], media['image']
     return jsonify({
-        'hasVideo': os.path.exists(monitored_files['video']['path']),
-        'hasImage': os.path.exists(monitored_files['image']['path']),
-        'videoTimestamp': monitored_files['video']['last_modified'],
-        'imageTimestamp': monitored_files['image']['last_modified'],
-        'updates': updates
+        'hasVideo': video is not None,
+        'hasImage': image is not None,
+        'videoUrl': video['url'] if video else None,
+        'imageUrl': image['url'] if image else None,
+        'videoTimestamp': video['created'] if video else 0,
+        'imageTimestamp': image['created'] if image else 0,
+        'video': video,
+        'image': image
     })
 
 
+@app.route('/media/<path:filename>')
+def serve_media(filename):
+    """Serve content-addressed media; a URL always refers to the same bytes"""
+    response = send_from_directory(media_store.root, filename, max_age=MEDIA_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}, immutable'
+    return response
+
+
+@app.route('/media_library')
+def media_library():
+    """List the stored media, newest first"""
+    return jsonify(media_store.list())
+
+
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     """Serve static files with proper caching headers"""
@@ -696,7 +621,6 @@ def serve_static(filename):
 
 @app.route('/transcript')
 def get_transcript():
-    global main_thread_running
     message = ''
     clear = False
     try:
@@ -710,22 +634,17 @@ def get_transcript():
     return jsonify({
         'message': message.strip(),
         'clear': clear,
-        'is_running': main_thread_running
+        'is_running': assistant.is_running()
     })
 
 
 @app.route('/start_main', methods=['POST'])
 def start_main():
-    global main_thread, main_thread_running
-
-    if main_thread_running:
+    if assistant.is_running():
         return jsonify({'status': 'already_running', 'message': 'Program is already running'})
 
     try:
-        main_thread = threading.Thread(target=run_main, daemon=True)
-        main_thread.start()
-        # Wait a moment to ensure the thread starts properly
-        time.sleep(0.5)
+        assistant.start()
         return jsonify({'status': 'started', 'message': 'Program started successfully'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to start program: {str(e)}'})
@@ -734,7 +653,7 @@ def start_main():
 @app.route('/start_whiteboard', methods=['POST'])
 def start_whiteboard():
     """Start the whiteboard in a separate process"""
-    if not main_thread_running:
+    if not assistant.is_running():
         return jsonify({'status': 'error', 'message': 'Main program must be running first'})
 
     success = run_whiteboard()
@@ -746,9 +665,9 @@ def start_whiteboard():
 
 @app.route('/stop_main', methods=['POST'])
 def stop_main():
-    global main_thread_running, whiteboard_process
+    global whiteboard_process
 
-    if not main_thread_running:
+    if not assistant.is_running():
         return jsonify({'status': 'not_running', 'message': 'Program is not running'})
 
     try:
@@ -759,15 +678,30 @@ def stop_main():
             except:
                 pass
 
-        # Signal the main thread to stop
-        main_thread_running = False
-        # Give it some time to clean up
-        time.sleep(1)
-        return jsonify({'status': 'stopped', 'message': 'Program stopped successfully'})
+        # Cancels every in-flight stage; the process is terminated if it does not exit in time
+        report = assistant.stop()
+        return jsonify({'status': 'stopped', 'message': 'Program stopped successfully', 'report': report})
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to stop program: {str(e)}'})
 
 
+@app.route('/metrics')
+def metrics():
+    """Expose tracker and response cache metrics in the Prometheus text format"""
+    snapshots = {}
+    # The tracker and the response cache live in the assistant process, which forwards their stats
+    forwarded = assistant.stats
+    if forwarded.get('tracker'):
+        snapshots['default'] = forwarded['tracker']
+    snapshots.update(forwarded.get('streams') or {})
+    text = render_prometheus(snapshots)
+    if forwarded.get('response_cache'):
+        text += render_cache_prometheus(forwarded['response_cache'])
+    if forwarded.get('vision_cache'):
+        text += render_cache_prometheus(forwarded['vision_cache'], prefix='learnitlive_vision_cache')
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/refresh_video')
 def refresh_video():
     """Force browser to reload the video by adding a timestamp parameter"""
@@ -787,8 +721,13 @@ if __name__ == '__main__':
         with open('static/placeholder.mp4', 'w') as f:
             f.write('placeholder')
 
+    # Registered only when run as the server, never in a process that imports this module
+    atexit.register(cleanup)
     signal.signal(signal.SIGINT, lambda s, f: cleanup())
     signal.signal(signal.SIGTERM, lambda s, f: cleanup())
 
+    if not camera_broker.start():
+        print("Camera broker failed to start, vision features will open the webcam directly")
+
     # Use threaded=False to avoid more logging issues
     app.run(debug=False, host='0.0.0.0', port=8000, use_reloader=False, threaded=True)
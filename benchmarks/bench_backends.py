@@ -0,0 +1,100 @@
+"""Compare YOLO inference backends on recorded video for speed and detection parity.
+
+Run from the repository root:
+    python benchmarks/bench_backends.py --video classroom.mp4 --backends torch onnxruntime openvino
+The first backend is the reference that the others are compared against.
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from YOLOBackends import available_backends, create_backend
+
+
+def read_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def box_iou(a, b):
+    """IoU matrix between two N x 4 and M x 4 xyxy arrays"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def count_matches(reference, candidate, iou_threshold=0.5):
+    """Greedily match same-class boxes with IoU above the threshold"""
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0
+    iou = box_iou(reference['xyxy'], candidate['xyxy'])
+    iou[reference['cls'][:, None] != candidate['cls'][None, :]] = 0
+    matches = 0
+    while True:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        if iou[i, j] < iou_threshold:
+            return matches
+        matches += 1
+        iou[i, :] = 0
+        iou[:, j] = 0
+
+
+def run_backend(name, frames, args):
+    backend = create_backend(name, args.model, args.imgsz, args.threads, warmup=3)
+    outputs = []
+    start = time.perf_counter()
+    for frame in frames:
+        outputs.append(backend.predict([frame], conf=args.conf)[0])
+    elapsed = time.perf_counter() - start
+    return outputs, len(frames) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--video', required=True)
+    parser.add_argument('--backends', nargs='+', default=available_backends()[::-1])
+    parser.add_argument('--model', default="yolov8n.pt")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--conf', type=float, default=0.5)
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    if not frames:
+        sys.exit(f"Could not read frames from {args.video}")
+    print(f"{len(frames)} frames from {args.video}, imgsz {args.imgsz}, threads {args.threads or 'default'}")
+
+    reference = None
+    for name in args.backends:
+        outputs, fps = run_backend(name, frames, args)
+        line = f"{name:>12}: {fps:7.1f} FPS"
+        if reference is None:
+            reference = outputs
+            line += "  (reference)"
+        else:
+            matched = sum(count_matches(r, c) for r, c in zip(reference, outputs))
+            ref_total = sum(len(r) for r in reference)
+            cand_total = sum(len(c) for c in outputs)
+            line += (f"  recall {matched / max(ref_total, 1):6.1%}"
+                     f"  precision {matched / max(cand_total, 1):6.1%} vs {args.backends[0]}")
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Measure the whiteboard loop headlessly on recorded video and compare against a stored baseline.
+
+Run from the repository root:
+    python benchmarks/bench_whiteboard.py --source lesson.mp4 --save-baseline
+    python benchmarks/bench_whiteboard.py --source lesson.mp4 --compare
+--source also takes an image directory or a glob such as 'frames/*.png'. Staggered mode runs
+the models inside the loop, so their cost shows up in the stage timings; parallel mode measures
+the render loop with the models in worker threads.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from WhiteBoardFeature.VirtualPainter import STAGES, VirtualPainter
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'whiteboard.json')
+
+
+def print_run(result):
+    print(f"{result['frames']} frames in {result['seconds']:.1f} s: {result['fps']:.1f} FPS")
+    for stage in STAGES:
+        print(f"{stage:>12}: {result['stages_ms'][stage]:7.2f} ms")
+    for name, stats in result['perception'].items():
+        print(f"{name + ' model':>12}: {stats['avg_ms']:7.2f} ms over {stats['runs']} runs")
+    print(f"{'filters':>12}: {sum(result['filters_us'].values()):7.1f} us")
+
+
+def compare(result, baseline, tolerance):
+    """Print the change against the baseline; returns False if FPS regressed by more than tolerance"""
+    print(f"Against baseline ({baseline['frames']} frames, {baseline['fps']:.1f} FPS):")
+    change = result['fps'] / baseline['fps'] - 1 if baseline['fps'] else 0.0
+    print(f"{'fps':>12}: {baseline['fps']:7.1f} -> {result['fps']:7.1f} ({change:+.1%})")
+    for stage in STAGES:
+        before, after = baseline['stages_ms'].get(stage, 0.0), result['stages_ms'][stage]
+        delta = f"({after / before - 1:+.1%})" if before else ""
+        print(f"{stage:>12}: {before:7.2f} -> {after:7.2f} ms {delta}")
+    return change >= -tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', required=True)
+    parser.add_argument('--mode', choices=('parallel', 'staggered'), default='staggered')
+    parser.add_argument('--frames', type=int, default=None)
+    parser.add_argument('--inference-width', type=int, default=640)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed FPS drop before failing")
+    args = parser.parse_args()
+
+    result = VirtualPainter(perceptionMode=args.mode, sessionPath=None, snapshotPath=None,
+                            inferenceWidth=args.inference_width, source=args.source, headless=True,
+                            maxFrames=args.frames)
+    if not result['frames']:
+        sys.exit(f"Could not read frames from {args.source}")
+    print_run(result)
+
+    # Baselines are kept per perception mode and inference width
+    key = f"{args.mode}@{args.inference_width}"
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.compare:
+        if key not in baselines:
+            sys.exit(f"No baseline for {key} in {args.baseline}; run with --save-baseline first")
+        if not compare(result, baselines[key], args.tolerance):
+            sys.exit(f"FPS regressed by more than {args.tolerance:.0%}")
+
+    if args.save_baseline:
+        baselines[key] = {'source': args.source, 'frames': result['frames'], 'fps': result['fps'],
+                          'stages_ms': result['stages_ms']}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Saved baseline {key} to {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
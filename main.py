@@ -1,18 +1,30 @@
 import cv2
 import openai
 import base64
+import re
 import requests
 import time
+import json
 import numpy as np
 import speech_recognition as sr
 import pyttsx3  # Text-to-Speech
 import os
+import shutil
 from gtts import gTTS
 from manim import *
 from moviepy.editor import VideoFileClip, AudioFileClip
+from proglog import ProgressBarLogger
 import glob
 from WhiteBoardFeature import VirtualPainter as VP
 import threading
+import YOLOTracking as YT
+from CameraBroker import open_camera
+from WhiteBoardFeature.SnapshotLog import load_canvas, crop_to_ink
+from ResponseCache import ResponseCache
+from VisionCache import VisionCache
+from MediaStore import MediaStore, new_job_id, work_path
+from Cancellation import CancelToken, Cancelled, run_process, call_cancellable
+from ManimTemplates import SCENES, SPEC_ENV, TEMPLATE_GUIDE, validate_spec, fallback_spec
 
 
 # OpenAI API Key (Replace with your actual API key)
@@ -38,6 +50,30 @@ voices = engine.getProperty('voices')
 engine.setProperty('voice', voices[80].id)  # Changed from 80 to 0 for default voice
 
 
+# Quick identification questions can be answered from the running YOLO tracker
+QUICK_ID_PHRASES = ["what am i holding", "what is this", "what's this", "what is that",
+                   "what's that", "what do you see", "what am i showing", "what object is this"]
+# The whole utterance must be the question, optionally after a short lead-in; anything longer
+# ("what is this used for?") needs the remote model
+QUICK_ID_PATTERN = re.compile(r"^(?:(?:hey|ok|okay|so|look|look at this|look at that)[\s,]+)?(?:"
+                             + "|".join(re.escape(phrase) for phrase in QUICK_ID_PHRASES) + r")[\s?.!]*$")
+STABLE_FRAMES = 10       # Detection passes the object must have been seen in
+STABLE_CONFIDENCE = 0.7  # Minimum confidence in every one of those frames
+vision_stats = {'local': 0, 'cache': 0, 'cloud': 0}
+# Canvas snapshots written by the whiteboard process (see WhiteBoardFeature/SnapshotLog.py)
+WHITEBOARD_LOG = "whiteboard_sessions/canvas_log.bin"
+# Answers to earlier, similar prompts are reused instead of calling OpenAI again
+response_cache = ResponseCache("response_cache.json")
+# Vision answers reused for a near-identical camera frame (perceptual hash) and a similar question.
+# Held objects sit in the middle of the frame: hashing only the centre, within 3 bits, keeps a
+# different object in front of the same background from matching.
+vision_cache = VisionCache(max_distance=3, crop=0.5)
+# Finished videos, audio, scripts and frames are kept once each under a content hash
+media_store = MediaStore()
+# Cancelled when the assistant is asked to stop; every pipeline stage checks it or registers an abort
+cancel_token = CancelToken()
+
+
 
 
 def speak(text):
@@ -45,8 +81,10 @@ def speak(text):
    print(f"🤖 AI: {text}")
 
 
+   cancel_token.check('speech')
    # Use thread-safe approach for TTS
    with speech_engine_lock:
+       handle = cancel_token.on_cancel(engine.stop)
        try:
            #initialize_engine()
            engine.say(text)
@@ -56,8 +94,11 @@ def speak(text):
            print("TTS engine busy, using alternative method")
            # Use gTTS as a fallback
            tts = gTTS(text=text, lang='en')
-           tts.save("temp_speech.mp3")
-           os.system("afplay temp_speech.mp3")  # For macOS, use appropriate command for your OS
+           call_cancellable(cancel_token, 'speech', tts.save, "temp_speech.mp3")
+           run_process(["afplay", "temp_speech.mp3"], cancel_token, 'speech')  # For macOS, use appropriate command for your OS
+       finally:
+           cancel_token.remove(handle)
+   cancel_token.check('speech')
 
 
 
@@ -68,9 +109,18 @@ def get_voice_input():
    with sr.Microphone() as source:
        recognizer.adjust_for_ambient_noise(source)
        print("🎤 Listening...")  # Print instead of speak to avoid recursive calls
+       # Listen in one-second slices so a stop request is noticed while waiting for speech
+       deadline = time.time() + 10
+       audio = None
+       while audio is None:
+           cancel_token.check('listening')
+           try:
+               audio = recognizer.listen(source, timeout=1, phrase_time_limit=15)
+           except sr.WaitTimeoutError:
+               if time.time() > deadline:
+                   return None
        try:
-           audio = recognizer.listen(source, timeout=10)
-           user_input = recognizer.recognize_google(audio)
+           user_input = call_cancellable(cancel_token, 'speech recognition', recognizer.recognize_google, audio)
            print(f"🗣️ You said: {user_input}")
            return user_input.lower()
        except sr.UnknownValueError:
@@ -85,7 +135,11 @@ def get_voice_input():
 
 def capture_frame():
    """ Capture an image from the webcam """
-   cap = cv2.VideoCapture(0)
+   # The running tracker owns the webcam, so reuse its latest raw frame
+   frame = YT.GetLatestRawFrame()
+   if frame is not None:
+       return store_frame(frame)
+   cap = open_camera(0)
    time.sleep(1)
    if not cap.isOpened():
        speak("Oops! I can't access the webcam.")
@@ -93,9 +147,7 @@ def capture_frame():
    ret, frame = cap.read()
    cap.release()
    if ret and isinstance(frame, np.ndarray):
-       img_path = "latest_frame.jpg"
-       cv2.imwrite(img_path, frame)
-       return img_path
+       return store_frame(frame)
    else:
        speak("Hmm, I couldn't capture a valid image. Let's try again.")
        return None
@@ -103,17 +155,28 @@ def capture_frame():
 
 
 
-def encode_image(image_path):
-   """ Encode image to base64 for API submission """
-   with open(image_path, "rb") as image_file:
-       return base64.b64encode(image_file.read()).decode("utf-8")
+def store_frame(frame, topic=None):
+   """ Save a frame to the media library and return its stored path """
+   img_path = work_path(new_job_id(), "frame.jpg")
+   cv2.imwrite(img_path, frame)
+   entry = media_store.add(img_path, 'image', topic=topic)
+   return media_store.path(entry)
 
 
 
 
-def analyze_image_with_gpt(image_path, user_prompt="What do you see?"):
-   """ Analyze an image using GPT-4 Vision """
-   base64_image = encode_image(image_path)
+def analyze_image_with_gpt(image_path, user_prompt="What do you see?", cache=None):
+   """ Analyze an image using GPT-4 Vision; returns (answer, 'cache' or 'cloud') """
+   with open(image_path, "rb") as image_file:
+       image_bytes = image_file.read()
+   # A repeated look at an unchanged scene is answered without uploading the image again
+   image = None
+   if cache is not None:
+       image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+   cached = cache.lookup(image, user_prompt) if image is not None else None
+   if cached is not None:
+       return cached[0], 'cache'
+   base64_image = base64.b64encode(image_bytes).decode("utf-8")
    headers = {"Authorization": f"Bearer {openai.api_key}"}
    payload = {
        "model": "gpt-4-turbo",
@@ -126,77 +189,179 @@ def analyze_image_with_gpt(image_path, user_prompt="What do you see?"):
        ],
        "max_tokens": 500
    }
+   # Closing the session on cancel aborts the upload in flight
+   session = requests.Session()
    try:
-       response = requests.post("https://api.openai.com/v1/chat/completions", json=payload, headers=headers)
+       response = call_cancellable(cancel_token, 'vision request', session.post,
+                                   "https://api.openai.com/v1/chat/completions", json=payload, headers=headers,
+                                   abort=session.close)
        if response.status_code == 200:
-           return response.json()["choices"][0]["message"]["content"]
+           answer = response.json()["choices"][0]["message"]["content"]
+           if image is not None:
+               cache.store(image, user_prompt, answer)
+           return answer, 'cloud'
        else:
            print(f"Error: {response.status_code}, {response.text}")
-           return "Error analyzing image."
+           return "Error analyzing image.", 'cloud'
    except Exception as e:
        print(f"Exception: {e}")
-       return "Error connecting to OpenAI service."
+       return "Error connecting to OpenAI service.", 'cloud'
+   finally:
+       session.close()
+
+
 
 
+def is_quick_identification(user_input):
+   """ Check whether the question only asks what the object is """
+   return QUICK_ID_PATTERN.match(user_input.strip()) is not None
 
 
-def generate_manim_script(topic):
-   """ Generate a Manim script using GPT """
-   prompt = f"Using the Manim library, create a valid and self-contained Python script that produces a clear, beginner-friendly animation explaining {topic}. Only use built-in Manim shapes, vector drawings, and text—do not reference or use any external images or files. All components and labels should be spaced out to avoid text overlap and ensure readability. The animation should be structured, visually engaging, and educational for a beginner audience. Return only the final Python Manim code with no markdown or explanation."
-   response = openai.ChatCompletion.create(
+
+
+def answer_from_tracker(user_input):
+   """ Answer quick identification questions from stable YOLO detections, or None to escalate """
+   if not is_quick_identification(user_input):
+       return None
+   detection = YT.GetStableDetection(STABLE_FRAMES, STABLE_CONFIDENCE)
+   if detection is None:
+       return None
+   label, confidence = detection
+   return f"That looks like a {label}. I'm {int(confidence * 100)}% sure."
+
+
+
+
+def record_vision_route(route):
+   """ Count tracker, cached and cloud vision answers and print how many avoided an upload """
+   vision_stats[route] += 1
+   total = sum(vision_stats.values())
+   offline = vision_stats['local'] + vision_stats['cache']
+   print(f"👁️ Vision: {route} answer, answered without upload {offline / total:.0%} ({total} requests)")
+
+
+
+
+def capture_whiteboard():
+   """ Save the latest whiteboard canvas, cropped to its ink, for analysis """
+   canvas, _ = load_canvas(WHITEBOARD_LOG)
+   if canvas is None:
+       return None
+   drawing = crop_to_ink(canvas)
+   if drawing is None:
+       return None
+   return store_frame(drawing, topic="whiteboard")
+
+
+
+
+def generate_manim_script(topic, voiceover_script=""):
+   """ Have GPT fill one of the Manim scene templates; returns (validated scene spec, whether it is a new GPT answer) """
+   cached = response_cache.get("manim_spec", topic)
+   if cached is not None:
+       return cached, False
+   prompt = f"Plan a clear, beginner-friendly animation explaining {topic}.\n{TEMPLATE_GUIDE}"
+   response = call_cancellable(
+       cancel_token, 'manim script request', openai.ChatCompletion.create,
        model="gpt-3.5-turbo",
-       messages=[{"role": "system", "content": "Generate valid Manim code."},
-                     {"role": "user", "content": prompt}]
+       messages=[{"role": "system", "content": "Reply with compact JSON only."},
+                     {"role": "user", "content": prompt}],
+       max_tokens=300,
+       temperature=0.2
    )
-   return response['choices'][0]['message']['content'].strip().replace("```python", "").replace("```", "")
+   reply = response['choices'][0]['message']['content'].strip().replace("```json", "").replace("```", "")
+   try:
+       spec = validate_spec(json.loads(reply))
+   except (ValueError, TypeError) as e:
+       print(f"Unusable scene spec for {topic}: {e}")
+       return fallback_spec(topic, voiceover_script), False
+   return spec, True
 
 
 
 
 def generate_voiceover_script(topic):
    """ Generate a short educational voiceover for the math topic """
+   cached = response_cache.get("voiceover", topic)
+   if cached is not None:
+       return cached
    prompt = f"Provide a 10-second explanation about '{topic}'."
-   response = openai.ChatCompletion.create(
+   response = call_cancellable(
+       cancel_token, 'voiceover script request', openai.ChatCompletion.create,
        model="gpt-3.5-turbo",
        messages=[{"role": "system", "content": "Generate educational explanations."},
                  {"role": "user", "content": prompt}]
    )
-   return response['choices'][0]['message']['content'].strip()
+   script = response['choices'][0]['message']['content'].strip()
+   response_cache.put("voiceover", topic, script)
+   return script
 
 
 
 
-def create_manim_video(manim_script):
-   """ Create the Manim animation video """
-   with open("generated_manim_script.py", "w") as f:
-       f.write(manim_script)
-   os.system("manim -pql generated_manim_script.py")
+def create_manim_video(spec, job_id):
+   """ Render the spec with its pre-written template scene; returns the spec path and the job's media directory """
+   spec_path = cancel_token.track(work_path(job_id, "scene.json"))
+   # A per-job media directory keeps concurrent renders of the same scene apart
+   media_dir = cancel_token.track(work_path(job_id, "manim"))
+   with open(spec_path, "w") as f:
+       json.dump(spec, f)
+   # Own process group, so a stop kills manim together with its ffmpeg and LaTeX children
+   run_process(["manim", "-pql", "--media_dir", media_dir, "ManimTemplates.py", SCENES[spec['template']]],
+               cancel_token, 'manim render', env=dict(os.environ, **{SPEC_ENV: spec_path}))
+   return spec_path, media_dir
 
 
 
 
-def get_latest_manim_video():
-   """ Find the latest Manim-generated video file """
-   video_files = glob.glob("media/videos/generated_manim_script/480p15/*.mp4")
+def get_latest_manim_video(media_dir):
+   """ Find the latest video Manim rendered into a job's media directory """
+   video_files = glob.glob(os.path.join(media_dir, "videos", "*", "480p15", "*.mp4"))
    return max(video_files, key=os.path.getctime) if video_files else None
 
 
 
 
-def generate_voiceover(text):
-   """ Create a voiceover MP3 using gTTS """
+def generate_voiceover(text, job_id):
+   """ Create a voiceover MP3 using gTTS; returns its path """
+   audio_path = cancel_token.track(work_path(job_id, "voiceover.mp3"))
    tts = gTTS(text=text, lang='en')
-   tts.save("voiceover.mp3")
+   call_cancellable(cancel_token, 'voiceover', tts.save, audio_path)
+   return audio_path
+
+
+
+
+class CancellableLogger(ProgressBarLogger):
+   """ MoviePy progress logger that stops an encode, frame by frame, once the token is cancelled """
+
+   def __init__(self, token, stage):
+       super().__init__()
+       self.token = token
+       self.stage = stage
+
+   def callback(self, **changes):
+       self.token.check(self.stage)
 
+   def bars_callback(self, bar, attr, value, old_value=None):
+       self.token.check(self.stage)
 
 
 
-def combine_video_audio(video_path):
-   """ Combine Manim video with generated voiceover """
+
+def combine_video_audio(video_path, audio_path, job_id):
+   """ Combine Manim video with generated voiceover; returns the combined video path """
+   output_path = cancel_token.track(work_path(job_id, "final_video.mp4"))
    video = VideoFileClip(video_path)
-   audio = AudioFileClip("voiceover.mp3")
-   final_video = video.set_audio(audio)
-   final_video.write_videofile("final_video.mp4", codec="libx264")
+   audio = AudioFileClip(audio_path)
+   try:
+       final_video = video.set_audio(audio)
+       final_video.write_videofile(output_path, codec="libx264",
+                                   logger=CancellableLogger(cancel_token, 'video encode'))
+   finally:
+       video.close()
+       audio.close()
+   return output_path
 
 
 
@@ -205,13 +370,19 @@ def combine_video_audio(video_path):
 
 def generate_raspberrypi_video(topic):
    """ Generate a short educational voiceover for the math topic """
+   cached = response_cache.get("raspberrypi", topic)
+   if cached is not None:
+       return cached
    prompt = f"Provide a clear and thoughtful description about '{topic}'."
-   response = openai.ChatCompletion.create(
+   response = call_cancellable(
+       cancel_token, 'description request', openai.ChatCompletion.create,
        model="gpt-3.5-turbo",
        messages=[{"role": "system", "content": "Generate educational explanations."},
                  {"role": "user", "content": prompt}]
    )
-   return response['choices'][0]['message']['content'].strip()
+   description = response['choices'][0]['message']['content'].strip()
+   response_cache.put("raspberrypi", topic, description)
+   return description
 
 
 
@@ -219,52 +390,94 @@ def generate_raspberrypi_video(topic):
 
 
 def main():
-   """ Main AI assistant loop """
-   speak("Hello! I'm your AI assistant. How can I help you?")
-   while True:
-       user_input = get_voice_input()
-       if not user_input:
-           continue
-       if "quit" in user_input:
-           speak("Goodbye! Have a great day.")
-           break
-
-
-       # Detecting intent
-       if "holding" in user_input or "look at" in user_input or "analyze" in user_input:
-           speak("Alright, I'll analyze what you're holding. Give me a moment.")
-           image_path = capture_frame()
-           if image_path:
-               observation = analyze_image_with_gpt(image_path, user_input)
-               speak(f"Here's what I see: {observation}")
-           else:
-               speak("I couldn't get a clear image. Try again.")
-
-
-       elif "teach me" in user_input or "learn" in user_input:
-           topic = user_input.replace("teach me about", "").strip()
-           speak(f"Got it! I'll create a Manim video about {topic}.")
-           #VP.VirtualPainter()
-           manim_script = generate_manim_script(topic)
-           create_manim_video(manim_script)
-           voiceover_script = generate_voiceover_script(topic)
-           generate_voiceover(voiceover_script)
-           latest_video = get_latest_manim_video()
-           if latest_video:
-               combine_video_audio(latest_video)
-               speak("Your educational video is ready!")
-
-
-       elif "set up" in user_input:
-           topic = user_input.replace("set up the", "").strip()
-           os.system("manim -pql RaspberryPi.py")
-           speak("Alright, I'll help you set up the Raspberry Pi. Give me a moment.")
-           raspberrypi_script = generate_raspberrypi_video(topic)
-           speak(f"Here's what I see: {raspberrypi_script}")
+   """ Main AI assistant loop; returns when the user quits or the cancel token is cancelled """
+   try:
+       speak("Hello! I'm your AI assistant. How can I help you?")
+       YT.YOLOTracking()
+       YT.tracker.enable_display(False)  # Frames are only displayed from the GUI thread
+       while True:
+           user_input = get_voice_input()
+           if not user_input:
+               continue
+           if "quit" in user_input:
+               speak("Goodbye! Have a great day.")
+               break
+
+
+           # Detecting intent
+           if "whiteboard" in user_input or "my drawing" in user_input:
+               # Checked before "analyze" so "analyze my whiteboard" reads the canvas, not the camera
+               image_path = capture_whiteboard()
+               if image_path:
+                   speak("Let me take a look at your whiteboard.")
+                   prompt = f"This is a student's whiteboard drawing. {user_input}. Give helpful feedback."
+                   # Not cached: a few new strokes barely change the hash but change the feedback
+                   feedback, _ = analyze_image_with_gpt(image_path, prompt)
+                   speak(f"Here's my feedback: {feedback}")
+               else:
+                   speak("Your whiteboard is empty. Draw something first!")
+
+
+           elif ("holding" in user_input or "look at" in user_input or "analyze" in user_input
+                 or is_quick_identification(user_input)):
+               local_answer = answer_from_tracker(user_input)
+               if local_answer:
+                   record_vision_route('local')
+                   speak(local_answer)
+                   continue
+               speak("Alright, I'll analyze what you're holding. Give me a moment.")
+               image_path = capture_frame()
+               if image_path:
+                   observation, route = analyze_image_with_gpt(image_path, user_input, cache=vision_cache)
+                   record_vision_route(route)
+                   speak(f"Here's what I see: {observation}")
+               else:
+                   speak("I couldn't get a clear image. Try again.")
+
+
+           elif "teach me" in user_input or "learn" in user_input:
+               topic = user_input.replace("teach me about", "").strip()
+               speak(f"Got it! I'll create a Manim video about {topic}.")
+               #VP.VirtualPainter()
+               job_id = new_job_id()
+               voiceover_script = generate_voiceover_script(topic)
+               scene_spec, new_spec = generate_manim_script(topic, voiceover_script)
+               spec_path, media_dir = create_manim_video(scene_spec, job_id)
+               audio_path = generate_voiceover(voiceover_script, job_id)
+               latest_video = get_latest_manim_video(media_dir)
+               if latest_video and new_spec:
+                   # Cached only once it has rendered, so a broken spec is never replayed for similar topics
+                   response_cache.put("manim_spec", topic, scene_spec)
+               final_path = combine_video_audio(latest_video, audio_path, job_id) if latest_video else None
+               if final_path:
+                   media_store.add(final_path, 'video', topic=topic)
+               media_store.add(spec_path, 'spec', topic=topic)
+               media_store.add(audio_path, 'audio', topic=topic)
+               # The results are in the media library; the render's partial movies, TeX cache and SVGs
+               # are not, and would otherwise stay outside its retention forever
+               shutil.rmtree(media_dir, ignore_errors=True)
+               cancel_token.keep_artifacts()
+               if final_path:
+                   speak("Your educational video is ready!")
+
+
+           elif "set up" in user_input:
+               topic = user_input.replace("set up the", "").strip()
+               run_process(["manim", "-pql", "RaspberryPi.py"], cancel_token, 'manim render')
+               speak("Alright, I'll help you set up the Raspberry Pi. Give me a moment.")
+               raspberrypi_script = generate_raspberrypi_video(topic)
+               speak(f"Here's what I see: {raspberrypi_script}")
 
 
-       else:
-           speak("I didn't quite understand. Could you rephrase?")
+           else:
+               speak("I didn't quite understand. Could you rephrase?")
+   except Cancelled:
+       # Every stage has been aborted; remove what the interrupted job left behind
+       cancel_token.cleanup()
+       report = cancel_token.report()
+       stages = ', '.join(report['stages']) or 'nothing in progress'
+       print(f"🛑 Stopped ({stages}), removed {len(report['removed'])} partial files "
+             f"in {report['seconds_to_stop']:.1f} s")
 
 
 
@@ -277,3 +490,5 @@ if __name__ == "__main__":
        # Clean shutdown of any resources
        if 'engine' in globals() and engine is not None:
            engine.stop()
+   finally:
+       YT.StopYOLOTracking()